@@ -1,6 +1,7 @@
 import dash
 from dash import dcc, html, Input, Output
 import dash_bootstrap_components as dbc
+from flask import jsonify
 
 # Import layouts
 from layouts.summary import summary_layout
@@ -9,7 +10,7 @@ from layouts.parcel_journey import parcel_journey_layout
 from layouts.volume import volume_layout
 from layouts.identification import identification_layout
 from layouts.recirculation import recirculation_layout
-from layouts.chatbot import chatbot_layout, register_chatbot_callbacks
+from layouts.chatbot import chatbot_layout, register_chatbot_callbacks, warm_chat_engine
 
 # Import navbar
 from components.navbar import navbar  
@@ -19,6 +20,8 @@ import callbacks.volume_callbacks
 import callbacks.summary_callbacks
 import callbacks.throughput_callbacks
 from callbacks.parcel_journey_callbacks import register_parcel_journey_callbacks
+from utils.api_client import response_cache, in_flight
+from utils.chatbot_cache import chat_cache
 
 # Initialize Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
@@ -31,6 +34,15 @@ app.layout = html.Div([
     html.Div(id='page-content', className='p-4')
 ])
 
+# Backend response and chatbot cache counters, for sizing the caches
+@app.server.route('/api/cache-stats')
+def cache_stats():
+    return jsonify({
+        **response_cache.stats(),
+        "in_flight": in_flight.stats(),
+        "chatbot": chat_cache.stats(),
+    })
+
 # Register callbacks
 register_parcel_journey_callbacks(app)
 register_chatbot_callbacks(app)
@@ -49,7 +61,8 @@ def display_page(pathname):
     elif pathname == '/recirculation':
         return recirculation_layout
     elif pathname == '/chatbot':
-        return chatbot_layout
+        warm_chat_engine()
+        return chatbot_layout()
     elif pathname == '/login':
         return html.H3("Login Page Placeholder", className="text-muted text-center mt-5")
     else:
@@ -0,0 +1,28 @@
+// Lazy RAW logs for the parcel journey table.
+// A parcel's log is only fetched when its row is selected, and is kept in a
+// session store keyed by host id so reselecting it needs no server call.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    parcel_journey: {
+        showRawLog: function (activeCell, rows, queryId, cache) {
+            const noUpdate = window.dash_clientside.no_update;
+            if (!activeCell || !rows || !rows[activeCell.row]) {
+                return [noUpdate, noUpdate, noUpdate, noUpdate];
+            }
+
+            const row = rows[activeCell.row];
+            const hostId = row["HOST ID"];
+            const key = hostId ? String(hostId) : queryId + ":" + row.id;
+            const title = "RAW Logs for " + (hostId ? "HOST ID " + hostId : "Parcel #" + (row.id + 1));
+
+            if (cache && cache[key] !== undefined) {
+                return [title, cache[key], true, noUpdate];
+            }
+            return [
+                title,
+                "Loading RAW log...",
+                true,
+                {key: key, query_id: queryId, row_id: row.id, host_id: hostId || null}
+            ];
+        }
+    }
+});
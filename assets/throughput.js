@@ -0,0 +1,165 @@
+// Client-side rendering of the throughput page.
+// The server stores the 1-minute series once per date/window; rebinning,
+// KPI averages and the area charts are all computed here, so changing the
+// bin size never reaches the server. Series longer than the chart point
+// budget arrive already rebinned and LTTB-downsampled per bin size
+// ("downsampled" mode, see build_display in utils/throughput_utils.py).
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    throughput: {
+        LABEL: /^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})/,
+
+        // Minutes since the epoch for "YYYY-MM-DD HH:MM" labels, else null
+        labelMinutes: function (label) {
+            const m = this.LABEL.exec(label);
+            if (!m) {
+                return null;
+            }
+            return Date.UTC(+m[1], +m[2] - 1, +m[3], +m[4], +m[5]) / 60000;
+        },
+
+        // Sums consecutive 1-minute bins into clock-aligned bins of binSize minutes
+        rebin: function (x, values, binSize) {
+            if (!binSize || binSize <= 1) {
+                return {x: x, y: values};
+            }
+            const outX = [];
+            const outY = [];
+            let current = null;
+            for (let i = 0; i < x.length; i++) {
+                const minutes = this.labelMinutes(x[i]);
+                const bucket = Math.floor((minutes === null ? i : minutes) / binSize);
+                if (bucket !== current) {
+                    current = bucket;
+                    outX.push(x[i]);
+                    outY.push(0);
+                }
+                outY[outY.length - 1] += values[i] || 0;
+            }
+            return {x: outX, y: outY};
+        },
+
+        average: function (values) {
+            if (!values.length) {
+                return 0;
+            }
+            const total = values.reduce(function (a, b) { return a + b; }, 0);
+            return Math.round((total / values.length) * 100) / 100;
+        },
+
+        areaFigure: function (series, title, color, options) {
+            const figure = {
+                data: [{
+                    type: series.x.length > options.webglThreshold ? "scattergl" : "scatter",
+                    x: series.x,
+                    y: series.y,
+                    fill: "tozeroy",
+                    mode: "lines",
+                    line: {color: color},
+                    name: title
+                }],
+                layout: {
+                    title: {text: title},
+                    xaxis: {title: {text: "Time"}},
+                    yaxis: {title: {text: "Number of Parcels"}},
+                    plot_bgcolor: "white",
+                    paper_bgcolor: "white",
+                    margin: {l: 20, r: 20, t: 50, b: 30},
+                    height: 350,
+                    autosize: false,
+                    // Keep the user's zoom while refined data is swapped in
+                    uirevision: options.key
+                }
+            };
+            if (options.range) {
+                figure.layout.xaxis.range = options.range;
+            }
+            return figure;
+        },
+
+        // Rebinned traces and averages for one series at the selected bin size
+        traces: function (series, binSize) {
+            if (series.mode === "downsampled") {
+                const bin = series.bins[String(binSize)];
+                return {in: bin.in, out: bin.out, avgIn: bin.avg_in, avgOut: bin.avg_out};
+            }
+            const inSeries = this.rebin(series.x, series.in, binSize);
+            const outSeries = this.rebin(series.x, series.out, binSize);
+            return {
+                in: inSeries,
+                out: outSeries,
+                avgIn: this.average(inSeries.y),
+                avgOut: this.average(outSeries.y)
+            };
+        },
+
+        dateMode: function (mode) {
+            const hide = {display: "none"};
+            return mode === "range" ? [hide, {}] : [{}, hide];
+        },
+
+        viewport: function () {
+            return window.innerWidth;
+        },
+
+        // Turns a zoom on either chart into a refetch request for downsampled series
+        zoom: function (relayoutIn, relayoutOut, series) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggered = window.dash_clientside.callback_context.triggered;
+            const relayout = triggered.length && triggered[0].prop_id.startsWith("throughput-out-graph")
+                ? relayoutOut : relayoutIn;
+            if (!series || series.mode !== "downsampled" || !relayout) {
+                return noUpdate;
+            }
+            if (relayout["xaxis.autorange"]) {
+                return null;
+            }
+            const range = relayout["xaxis.range"] ||
+                [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]];
+            const label = window.dash_clientside.throughput.LABEL;
+            if (!range[0] || !range[1] || !label.test(range[0]) || !label.test(range[1])) {
+                return noUpdate;
+            }
+            return {key: series.key, start: range[0].slice(0, 16), end: range[1].slice(0, 16)};
+        },
+
+        render: function (series, zoomSeries, binSize) {
+            const noUpdate = window.dash_clientside.no_update;
+            const hide = {display: "none"};
+            const show = {};
+
+            if (!series) {
+                return [null, null, hide, hide].concat(Array(9).fill(noUpdate));
+            }
+            if (series.message) {
+                return [series.message, "text-" + series.level, hide, hide].concat(Array(9).fill(noUpdate));
+            }
+
+            const ns = window.dash_clientside.throughput;
+            const kpis = ns.traces(series, binSize);
+            const zoomed = zoomSeries && zoomSeries.key === series.key;
+            const charts = zoomed ? ns.traces(zoomSeries, binSize) : kpis;
+            const options = {
+                key: series.key,
+                webglThreshold: series.webgl_threshold,
+                range: zoomed ? zoomSeries.range : null
+            };
+
+            // e.g. a date range cut to the maximum number of days
+            return [
+                series.notice || null,
+                series.notice ? "text-warning" : null,
+                show,
+                show,
+                series.total_in,
+                series.total_out,
+                series.overflow,
+                "Avg Parcels IN / " + binSize + " min",
+                kpis.avgIn,
+                "Avg Parcels OUT / " + binSize + " min",
+                kpis.avgOut,
+                ns.areaFigure(charts.in, "Parcels IN Every " + binSize + " Minutes", "#198754", options),
+                ns.areaFigure(charts.out, "Parcels OUT Every " + binSize + " Minutes", "#dc3545", options)
+            ];
+        }
+    }
+});
@@ -0,0 +1,29 @@
+// Client-side validation of HH:MM time windows.
+// Only complete, valid windows that differ from the current one are written
+// to the window store, so partial keystrokes never reach the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    time_window: {
+        validate: function (start, end, current) {
+            const noUpdate = window.dash_clientside.no_update;
+            const re = /^([01]?\d|2[0-3]):([0-5]\d)(:[0-5]\d)?$/;
+
+            function normalize(value) {
+                const match = re.exec((value || "").trim());
+                if (!match) {
+                    return null;
+                }
+                return match[1].padStart(2, "0") + ":" + match[2];
+            }
+
+            const startTime = normalize(start);
+            const endTime = normalize(end);
+            if (!startTime || !endTime) {
+                return noUpdate;
+            }
+            if (current && current.start_time === startTime && current.end_time === endTime) {
+                return noUpdate;
+            }
+            return {start_time: startTime, end_time: endTime};
+        }
+    }
+});
@@ -0,0 +1,68 @@
+"""Chatbot pipeline load test against the stub LLM.
+
+Submits questions from several simulated users at once through the chat
+pipeline, with the LLM replaced by utils/chatbot_stub.py (canned responses
+with configurable latency), and reports answer latency percentiles, the
+deepest queue seen and the LLM request rate the token bucket allowed.
+
+Usage:
+    python benchmarks/chatbot_load.py [--users 20] [--latency 1.0] [--token-delay 0.02]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    os.environ["CHATBOT_LLM"] = "stub"
+    os.environ["CHATBOT_STUB_LATENCY"] = str(args.latency)
+    os.environ["CHATBOT_STUB_TOKEN_DELAY"] = str(args.token_delay)
+
+    from config import ConfigData
+    from utils.chatbot_cache import chat_cache
+    from utils.chatbot_pipeline import get_chat_engine, get_chat_pipeline
+    from utils.chatbot_sandbox import get_sandbox
+
+    chat_cache.clear()
+    get_sandbox()
+    get_chat_engine()
+    pipeline = get_chat_pipeline()
+
+    # Distinct questions, so every one makes both LLM requests
+    start = time.perf_counter()
+    futures = [
+        pipeline.submit(uuid.uuid4().hex, f"load test question {i} {uuid.uuid4().hex}", time.perf_counter())
+        for i in range(args.users)
+    ]
+    deepest = 0
+    while not all(f.done() for f in futures):
+        deepest = max(deepest, pipeline.stats()["waiting"])
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    # Error and stop entries carry no elapsed_ms
+    answers = [f.result() for f in futures]
+    latencies = sorted(a["elapsed_ms"] / 1000 for a in answers if "elapsed_ms" in a)
+    errors = len(answers) - len(latencies)
+    print(f"{args.users} users, max {ConfigData.CHATBOT_MAX_CONCURRENT} concurrent, "
+          f"{ConfigData.CHATBOT_LLM_REQUESTS_PER_MINUTE} LLM requests/min (burst {ConfigData.CHATBOT_LLM_BURST})")
+    print(f"total {elapsed:.2f}s, deepest queue {deepest}, errors {errors}, "
+          f"LLM requests {2 * args.users / elapsed * 60:.0f}/min")
+    if latencies:
+        print(f"latency p50 {statistics.median(latencies):.2f}s, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.2f}s, max {latencies[-1]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
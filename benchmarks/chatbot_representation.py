@@ -0,0 +1,130 @@
+"""Chatbot data representation benchmark.
+
+Runs a fixed set of chatbot questions, each with the code the LLM typically
+generates for the "records" representation (loops over `data`) and for the
+"dataframe" representation (vectorized pandas over `df`/`events`), against
+PARCEL_DATA_PATH, and reports the median execution latency of each and
+whether both answers agree.
+
+Usage:
+    python benchmarks/chatbot_representation.py [--runs 5] [--json out.json]
+"""
+import argparse
+import json
+import os
+import pickle
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from utils.parcel_data import get_parcel_source  # noqa: E402
+from utils.parcel_frames import get_parcel_frames  # noqa: E402
+
+QUESTIONS = [
+    (
+        "How many parcels were unsorted?",
+        "result = sum(1 for p in data if p.get('status') == 'unsorted')",
+        "result = int((df['status'] == 'unsorted').sum())",
+    ),
+    (
+        "What is the barcode error rate?",
+        "result = round(100 * sum(1 for p in data if p.get('barcode_error')) / len(data), 2)",
+        "result = round(100 * float(df['barcode_error'].fillna(False).mean()), 2)",
+    ),
+    (
+        "Average parcel length per status?",
+        "totals = {}\n"
+        "for p in data:\n"
+        "    length = (p.get('volume_data') or {}).get('length')\n"
+        "    if length is not None:\n"
+        "        s = totals.setdefault(p.get('status'), [0, 0])\n"
+        "        s[0] += length\n"
+        "        s[1] += 1\n"
+        "result = {k: round(v[0] / v[1], 2) for k, v in sorted(totals.items())}",
+        "result = {k: round(float(v), 2) for k, v in "
+        "df.groupby('status', observed=True)['length'].mean().sort_index().items()}",
+    ),
+    (
+        "Top 5 actual destinations?",
+        "counts = {}\n"
+        "for p in data:\n"
+        "    d = p.get('actual_destination')\n"
+        "    if d is not None:\n"
+        "        counts[d] = counts.get(d, 0) + 1\n"
+        "result = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:5]",
+        "counts = df['actual_destination'].value_counts()\n"
+        "counts = counts[counts > 0].rename_axis('d').reset_index(name='n')"
+        ".sort_values(['n', 'd'], ascending=[False, True])\n"
+        "result = [(str(d), int(n)) for d, n in counts.head(5).itertuples(index=False)]",
+    ),
+    (
+        "Parcels larger than 600 x 400 x 300 mm?",
+        "result = sum(1 for p in data if (p.get('volume_data') or {}).get('length', 0) > 600 "
+        "and (p.get('volume_data') or {}).get('width', 0) > 400 "
+        "and (p.get('volume_data') or {}).get('height', 0) > 300)",
+        "result = int(((df['length'] > 600) & (df['width'] > 400) & (df['height'] > 300)).fillna(False).sum())",
+    ),
+    (
+        "How many parcels have more than two events?",
+        "result = sum(1 for p in data if len(p.get('events') or []) > 2)",
+        "result = int((events.groupby('parcel').size() > 2).sum())",
+    ),
+]
+
+
+def time_code(code, namespace, runs):
+    compiled = compile(code, "<benchmark>", "exec")
+    timings, result = [], None
+    for _ in range(runs):
+        scope = dict(namespace)
+        start = time.perf_counter()
+        exec(compiled, scope)
+        result = scope.get("result")
+        pickle.dumps(result)  # results are pickled back from the sandbox
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = get_parcel_source().records
+    records_load = time.perf_counter() - start
+    start = time.perf_counter()
+    df, events = get_parcel_frames()
+    frames_load = time.perf_counter() - start
+
+    print(f"{len(records):,} parcels, {len(events):,} events; "
+          f"records loaded in {records_load:.2f}s, frames built in {frames_load:.2f}s (once per data change)")
+    print(f"{'records ms':>11} {'frames ms':>10} {'speedup':>8}  same  question")
+
+    rows = []
+    for question, records_code, frame_code in QUESTIONS:
+        records_time, records_result = time_code(records_code, {"data": records}, args.runs)
+        frame_time, frame_result = time_code(frame_code, {"df": df, "events": events, "pd": pd, "np": np}, args.runs)
+        same = records_result == frame_result
+        rows.append({
+            "question": question,
+            "records_ms": records_time * 1000,
+            "dataframe_ms": frame_time * 1000,
+            "same_result": same,
+        })
+        print(f"{records_time * 1000:11.1f} {frame_time * 1000:10.1f} {records_time / frame_time:7.1f}x  "
+              f"{'yes' if same else 'NO ':4}  {question}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"parcels": len(records), "runs": args.runs, "questions": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
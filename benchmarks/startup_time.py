@@ -0,0 +1,84 @@
+"""Startup-time benchmark.
+
+Imports the app in a fresh interpreter with ``-X importtime`` and reports the
+slowest modules (self and cumulative microseconds) plus the wall time of the
+whole import, averaged over several runs.
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--top 25] [--module app] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module):
+    """Runs one cold import; returns (wall seconds, {module: (self_us, cumulative_us)})."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    walls = []
+    per_module = {}
+    for _ in range(args.runs):
+        wall, modules = import_profile(args.module)
+        walls.append(wall)
+        for name, timings in modules.items():
+            per_module.setdefault(name, []).append(timings)
+
+    rows = sorted(
+        (
+            (name, statistics.median(t[0] for t in timings), statistics.median(t[1] for t in timings))
+            for name, timings in per_module.items()
+        ),
+        key=lambda row: row[2],
+        reverse=True,
+    )
+
+    print(f"import {args.module}: median {statistics.median(walls):.3f}s, "
+          f"min {min(walls):.3f}s over {args.runs} runs")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in rows[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "module": args.module,
+                "runs": args.runs,
+                "wall_seconds": walls,
+                "modules": {name: {"self_us": s, "cumulative_us": c} for name, s, c in rows},
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,184 @@
-from dash import Input, Output, State, no_update, html, dash_table
-import pandas as pd
+from dash import Input, Output, State, Patch, no_update, html, ClientsideFunction
+import os
 import requests
-import json
+from config import ConfigData
+from utils.background import background_callback_manager
+from utils.parcel_journey_utils import (
+    fetch_parcel_journey,
+    results_to_frame,
+    save_results,
+    table_columns,
+    parse_bulk_ids,
+    bulk_lookup,
+    load_results,
+    query_results,
+    load_raw_log
+)
+from utils.parcel_search import suggest, warm_suggestion_indexes
+from components.loading import running_outputs, HIDE
 
 def register_parcel_journey_callbacks(app):
+    # Build the local parcel and typeahead indexes up front, so the first
+    # keystroke doesn't pay for it and background jobs inherit them when forked
+    if os.path.exists(ConfigData.PARCEL_DATA_PATH):
+        warm_suggestion_indexes()
+
     @app.callback(
         Output('parcel-journey-output', 'children'),
+        Output('parcel-journey-query', 'data'),
+        Output('parcel-journey-table', 'columns'),
+        Output('parcel-journey-table', 'page_current'),
+        Output('parcel-journey-results', 'style'),
         Input('get-details-btn', 'n_clicks'),
         State('date-picker', 'date'),
         State('search-based-on', 'value'),
         State('search-input', 'value'),
-        prevent_initial_call=True
+        prevent_initial_call=True,
+        background=True,
+        manager=background_callback_manager,
+        running=running_outputs('parcel-journey-loading', 'get-details-btn'),
+        cancel=[Input('url', 'pathname')]
     )
     def get_details(n_clicks, date, search_by, input_value):
+        def message(text, level):
+            return html.Div(text, className=f"text-{level}"), None, no_update, no_update, HIDE
+
         if not input_value:
-            return html.Div("Please enter a value to search.", className="text-danger")
+            return message("Please enter a value to search.", "danger")
 
         try:
-            payload = {
-                "date": date,
-                "search_by": search_by,
-                "search_value": input_value,
-            }
-
-            API_URL = "http://127.0.0.1:8000/parcel-journey"
-            response = requests.post(API_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
+            data = fetch_parcel_journey(date, search_by, input_value)
 
             if not data:
-                return html.Div("No parcel journey data found.", className="text-warning")
-
-            # Convert barcode list to string
-            for entry in data:
-                if isinstance(entry.get("barcode"), list):
-                    entry["barcode"] = ", ".join(entry["barcode"])
-
-            df = pd.DataFrame(data)
-
-            # Rename columns for display
-            df.rename(columns={
-                "host_id": "HOST ID",
-                "status": "Status",
-                "barcodes": "Barcode(s)",
-                "alibi_id": "Alibi ID",
-                "register_on_and_at": "Register Time & Location",
-                "identification_on_and_at":"identification Time & Location",
-                "exit_on_and_at":"exit Time & Location",
-                "destination": "Destination",
-                "volume Data": "Volume",  # This is the only change you need for column name
-            }, inplace=True)
-
-            # Extract and display RAW logs
-            raw_logs = []
-            for idx, entry in enumerate(data):
-                raw_content = entry.get("RAW", {})
-                if isinstance(raw_content, dict):
-                    raw_text = "\n".join([f"{k}: {v}" for k, v in raw_content.items()])
-                elif isinstance(raw_content, str):
-                    try:
-                        parsed = json.loads(raw_content)
-                        raw_text = "\n".join([f"{k}: {v}" for k, v in parsed.items()])
-                    except json.JSONDecodeError:
-                        raw_text = raw_content
-                else:
-                    raw_text = str(raw_content)
-
-                raw_logs.append(html.Details([
-                    html.Summary(f"RAW Logs for Parcel #{idx + 1}"),
-                    html.Pre(raw_text, style={"whiteSpace": "pre-wrap"})
-                ]))
-
-            if "RAW" in df.columns:
-                df = df.drop(columns=["RAW"])
-
-            return html.Div([
-                dash_table.DataTable(
-                    columns=[{"name": col, "id": col} for col in df.columns],
-                    data=df.to_dict("records"),
-                    page_size=10,
-                    style_table={"overflowX": "auto", "border": "1px solid #dee2e6", "borderRadius": "6px"},
-                    style_cell={
-                        "textAlign": "left",
-                        "padding": "6px",
-                        "borderBottom": "1px solid #dee2e6",
-                    },
-                    style_header={
-                        "backgroundColor": "#f8f9fa",
-                        "fontWeight": "bold",
-                        "borderBottom": "2px solid #dee2e6",
-                    },
-                    style_data={"backgroundColor": "#ffffff"}
-                ),
-                html.Hr(),
-                html.Div(raw_logs)
-            ])
+                return message("No parcel journey data found.", "warning")
+
+            # The full result set stays server-side; pages are served by
+            # update_parcel_journey_page
+            df = results_to_frame(data)
+            return None, save_results(df), table_columns(df), 0, {}
 
         except requests.exceptions.RequestException as e:
-            return html.Div(f"Error connecting to the API: {str(e)}", className="text-danger")
+            return message(f"Error connecting to the API: {str(e)}", "danger")
         except Exception as e:
-            return html.Div(f"Error fetching data: {str(e)}", className="text-danger")
+            return message(f"Error fetching data: {str(e)}", "danger")
+
+    @app.callback(
+        Output('parcel-journey-output', 'children', allow_duplicate=True),
+        Output('parcel-journey-query', 'data', allow_duplicate=True),
+        Output('parcel-journey-table', 'columns', allow_duplicate=True),
+        Output('parcel-journey-table', 'page_current', allow_duplicate=True),
+        Output('parcel-journey-results', 'style', allow_duplicate=True),
+        Input('bulk-lookup-btn', 'n_clicks'),
+        State('date-picker', 'date'),
+        State('search-based-on', 'value'),
+        State('bulk-ids-input', 'value'),
+        State('bulk-ids-upload', 'contents'),
+        prevent_initial_call=True,
+        background=True,
+        manager=background_callback_manager,
+        running=running_outputs('bulk-lookup-progress-row', 'bulk-lookup-btn', 'get-details-btn'),
+        progress=[Output('bulk-lookup-progress', 'value'), Output('bulk-lookup-progress', 'label')],
+        progress_default=[0, ""],
+        cancel=[Input('url', 'pathname'), Input('bulk-lookup-cancel-btn', 'n_clicks')]
+    )
+    def bulk_get_details(set_progress, n_clicks, date, search_by, pasted_ids, upload_contents):
+        ids = parse_bulk_ids(pasted_ids, upload_contents)
+        if not ids:
+            return html.Div("Paste IDs or upload a CSV to look up.", className="text-danger"), \
+                None, no_update, no_update, HIDE
+
+        last_percent = [-1]
+
+        def report(done, total):
+            percent = int(done * 100 / total)
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                set_progress([percent, f"{done} / {total}"])
+
+        rows = bulk_lookup(date, search_by, ids, on_progress=report)
+        df = results_to_frame(rows)
+
+        found = int(df.drop_duplicates("Lookup ID")["Lookup Status"].str.startswith("found").sum())
+        summary = html.Div(
+            f"Looked up {len(ids)} IDs: {found} found, {len(ids) - found} not found or failed.",
+            className="text-success" if found == len(ids) else "text-warning"
+        )
+        return summary, save_results(df), table_columns(df), 0, {}
+
+    # Typeahead: prefix matches first, then fuzzy (trigram) matches
+    @app.callback(
+        Output('search-suggestions', 'children'),
+        Input('search-input', 'value'),
+        State('search-based-on', 'value'),
+        prevent_initial_call=True
+    )
+    def update_search_suggestions(query, search_by):
+        try:
+            return [html.Option(value=s) for s in suggest(search_by, query)]
+        except OSError as e:
+            # No local parcel records to suggest from
+            print(f"Search suggestions unavailable: {e}")
+            return []
+
+    @app.callback(
+        Output('parcel-journey-table', 'data'),
+        Output('parcel-journey-table', 'page_count'),
+        Input('parcel-journey-query', 'data'),
+        Input('parcel-journey-table', 'page_current'),
+        Input('parcel-journey-table', 'page_size'),
+        Input('parcel-journey-table', 'sort_by'),
+        Input('parcel-journey-table', 'filter_query')
+    )
+    def update_parcel_journey_page(query_id, page_current, page_size, sort_by, filter_query):
+        df = load_results(query_id)
+        if df is None:
+            return [], 0
+
+        df = query_results(df, sort_by, filter_query)
+        page_size = page_size or ConfigData.PARCEL_JOURNEY_PAGE_SIZE
+        page_current = page_current or 0
+        start = page_current * page_size
+        page = df.iloc[start:start + page_size]
+        page_count = max(1, -(-len(df) // page_size))
+
+        # RAW logs are loaded on demand; rows carry their result index as
+        # the DataTable row id so a selected row can be looked up again
+        page = page.drop(columns=["RAW"], errors="ignore").assign(id=page.index)
+        page = page.astype(object).where(page.notna(), None)
+
+        return page.to_dict("records"), page_count
+
+    # Selecting a row shows its RAW log from the session cache, or asks the
+    # server for it (parcel_journey.showRawLog in assets/parcel_journey.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace="parcel_journey", function_name="showRawLog"),
+        Output('parcel-journey-raw-summary', 'children'),
+        Output('parcel-journey-raw-text', 'children'),
+        Output('parcel-journey-raw-details', 'open'),
+        Output('parcel-journey-raw-request', 'data'),
+        Input('parcel-journey-table', 'active_cell'),
+        State('parcel-journey-table', 'data'),
+        State('parcel-journey-query', 'data'),
+        State('parcel-journey-raw-cache', 'data'),
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        Output('parcel-journey-raw-cache', 'data'),
+        Output('parcel-journey-raw-text', 'children', allow_duplicate=True),
+        Input('parcel-journey-raw-request', 'data'),
+        State('date-picker', 'date'),
+        prevent_initial_call=True
+    )
+    def load_selected_raw_log(request, date):
+        if not request:
+            return no_update, no_update
+
+        raw_text = load_raw_log(request["query_id"], request["row_id"], date, request.get("host_id"))
+        if raw_text is None:
+            return no_update, "RAW log is no longer available; please search again."
+
+        # Only the new entry is sent back to the browser's session cache
+        cache = Patch()
+        cache[request["key"]] = raw_text
+        return cache, raw_text
@@ -1,6 +1,17 @@
-from dash import Output, Input, callback
+from dash import Output, Input, State, callback, clientside_callback, ClientsideFunction
 import plotly.graph_objects as go
 from utils.summary_utils import fetch_summary_data, generate_pie_chart_kpi
+from utils.background import background_callback_manager
+from components.loading import running_outputs
+
+# Only complete, valid HH:MM windows are forwarded to the server
+clientside_callback(
+    ClientsideFunction(namespace="time_window", function_name="validate"),
+    Output("summary-window", "data"),
+    Input("start-time", "value"),
+    Input("end-time", "value"),
+    State("summary-window", "data")
+)
 
 @callback(
     Output("total-parcels-kpi", "children"),
@@ -14,10 +25,15 @@ from utils.summary_utils import fetch_summary_data, generate_pie_chart_kpi
     Output("kpi-section", "style"),
     Output("chart-section", "style"),
     Input("date-picker", "date"),
-    Input("start-time", "value"),
-    Input("end-time", "value")
+    Input("summary-window", "data"),
+    background=True,
+    manager=background_callback_manager,
+    running=running_outputs("summary-loading"),
+    cancel=[Input("url", "pathname")]
 )
-def update_kpi_cards(selected_date, start_time, end_time):
+def update_kpi_cards(selected_date, window):
+    start_time, end_time = window["start_time"], window["end_time"]
+
     # if not selected_date or not start_time or not end_time:
     #     return ["N/A"] * 5 + [go.Figure()] * 3 + [{"display": "none"}, {"display": "none"}]
 
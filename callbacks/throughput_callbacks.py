@@ -1,55 +1,140 @@
-from dash import Output, Input, callback, html, dcc
-import plotly.graph_objects as go
-from utils.throughput_utils import fetch_throughput_data, generate_kpi_card, create_area_chart
+from dash import Output, Input, State, callback, clientside_callback, ClientsideFunction, set_props
+from utils.throughput_utils import build_display, day_chunks, zoom_chunks, fetch_series_chunks
+from utils.background import background_callback_manager
+from components.loading import running_outputs
 
-@callback(
-    Output("throughput-kpi-section", "children"),
-    Output("throughput-chart-section", "children"),
-    Input("throughput-date-picker", "date"),
-    Input("throughput-bin-size", "value"),
+# Only complete, valid HH:MM windows are forwarded to the server
+clientside_callback(
+    ClientsideFunction(namespace="time_window", function_name="validate"),
+    Output("throughput-window", "data"),
     Input("throughput-start-time", "value"),
-    Input("throughput-end-time", "value")
+    Input("throughput-end-time", "value"),
+    State("throughput-window", "data")
 )
-def update_throughput(selected_date, bin_size, start_time, end_time):
-    if not selected_date or not start_time or not end_time:
-        return html.Div("Please fill in all fields.", className="text-warning"), None
 
-    data = fetch_throughput_data(selected_date, bin_size, start_time, end_time)
+# Chart point budgets depend on the browser width
+clientside_callback(
+    ClientsideFunction(namespace="throughput", function_name="viewport"),
+    Output("throughput-viewport", "data"),
+    Input("url", "pathname")
+)
+
+clientside_callback(
+    ClientsideFunction(namespace="throughput", function_name="dateMode"),
+    Output("throughput-single-date", "style"),
+    Output("throughput-range-date", "style"),
+    Input("throughput-date-mode", "value")
+)
 
-    if not data:
-        return html.Div("No data received from server.", className="text-danger"), None
+# The 1-minute series is fetched once per date/window; bin size changes are
+# handled entirely in the browser by throughput.render. In range mode each
+# day is fetched as a separate chunk, and the merged series is pushed to the
+# browser as chunks arrive.
+@callback(
+    Output("throughput-series", "data"),
+    Input("throughput-date-mode", "value"),
+    Input("throughput-date-picker", "date"),
+    Input("throughput-date-range", "start_date"),
+    Input("throughput-date-range", "end_date"),
+    Input("throughput-window", "data"),
+    Input("throughput-viewport", "data"),
+    background=True,
+    manager=background_callback_manager,
+    running=running_outputs("throughput-loading"),
+    progress=[Output("throughput-progress", "children")],
+    progress_default=[None],
+    cancel=[Input("url", "pathname")]
+)
+def update_throughput(set_progress, date_mode, selected_date, range_start, range_end, window, viewport_width):
+    start_time, end_time = window["start_time"], window["end_time"]
+    if date_mode == "range":
+        first_date, last_date = range_start, range_end
+    else:
+        first_date = last_date = selected_date
+    if not first_date or not last_date or not start_time or not end_time:
+        return {"message": "Please fill in all fields.", "level": "warning"}
 
-    in_data = data.get("parcels_in_time", {})
-    out_data = data.get("parcels_out_time", {})
+    key = f"{first_date[:10]}..{last_date[:10]} {start_time}-{end_time}"
+    chunks = day_chunks(first_date, last_date, start_time, end_time)
+    # day_chunks stops at THROUGHPUT_MAX_RANGE_DAYS; say so next to the charts
+    notice = None
+    if chunks and chunks[-1][0] < last_date[:10]:
+        notice = f"Range truncated to {len(chunks)} days ({chunks[0][0]} to {chunks[-1][0]})."
 
-    if not any(in_data.values()) and not any(out_data.values()):
-        return html.Div("No data available for the selected date.", className="text-danger"), None
+    def stream_partial(done, total, merged):
+        set_progress([f"Loaded {done} of {total} days..."])
+        set_props("throughput-series", {"data": build_display(dict(merged, key=key, notice=notice), viewport_width)})
 
     try:
-        in_values = list(in_data.values())
-        out_values = list(out_data.values())
+        series = fetch_series_chunks(chunks, on_chunk=stream_partial)
+    except Exception as e:
+        print(f"Error in throughput callback: {e}")
+        return {"message": "Error displaying throughput data.", "level": "danger"}
 
-        avg_in = round(sum(in_values) / len(in_values), 2) if in_values else 0
-        avg_out = round(sum(out_values) / len(out_values), 2) if out_values else 0
+    if not series:
+        return {"message": "No data received from server.", "level": "danger"}
 
-        # KPIs in one row
-        kpis = html.Div([
-            generate_kpi_card("Total Parcels IN", data.get("total_in", 0), "card-total"),
-            generate_kpi_card("Total Parcels OUT", data.get("total_out", 0), "card-sorted"),
-            generate_kpi_card("Overflow", data.get("overflow", 0), "card-overflow"),
-            generate_kpi_card(f"Avg Parcels IN / {bin_size} min", avg_in, "card-throughput"),
-            generate_kpi_card(f"Avg Parcels OUT / {bin_size} min", avg_out, "card-throughput")
-        ], className="throughput-kpi-row")
+    if not any(series["in"]) and not any(series["out"]):
+        return {"message": "No data available for the selected date.", "level": "danger"}
 
+    series["key"] = key
+    series["notice"] = notice
+    return build_display(series, viewport_width)
 
-        # Charts in one row
-        charts = html.Div([
-            create_area_chart(in_data, f"Parcels IN Every {bin_size} Minutes", "#198754"),
-            create_area_chart(out_data, f"Parcels OUT Every {bin_size} Minutes", "#dc3545")
-        ], className="throughput-charts-row")
 
-        return kpis, charts
+# Zooming into a downsampled chart re-fetches the visible range at full
+# resolution (throughput.zoom only requests it for downsampled series)
+clientside_callback(
+    ClientsideFunction(namespace="throughput", function_name="zoom"),
+    Output("throughput-zoom", "data"),
+    Input("throughput-in-graph", "relayoutData"),
+    Input("throughput-out-graph", "relayoutData"),
+    State("throughput-series", "data"),
+    prevent_initial_call=True
+)
 
-    except Exception as e:
-        print(f"Error in throughput callback: {e}")
-        return html.Div("Error displaying throughput data.", className="text-danger"), None
+@callback(
+    Output("throughput-zoom-series", "data"),
+    Input("throughput-zoom", "data"),
+    State("throughput-window", "data"),
+    State("throughput-viewport", "data"),
+    background=True,
+    manager=background_callback_manager,
+    running=running_outputs("throughput-loading"),
+    cancel=[Input("url", "pathname")],
+    prevent_initial_call=True
+)
+def refine_throughput_zoom(zoom, window, viewport_width):
+    if not zoom:
+        return None
+
+    # Clip the zoomed range to the selected daily window
+    chunks = zoom_chunks(zoom["start"], zoom["end"], window["start_time"], window["end_time"])
+    series = fetch_series_chunks(chunks) if chunks else None
+    if not series:
+        return None
+
+    series["key"] = zoom["key"]
+    series["range"] = [zoom["start"], zoom["end"]]
+    return build_display(series, viewport_width)
+
+
+clientside_callback(
+    ClientsideFunction(namespace="throughput", function_name="render"),
+    Output("throughput-message", "children"),
+    Output("throughput-message", "className"),
+    Output("throughput-kpi-section", "style"),
+    Output("throughput-chart-section", "style"),
+    Output("throughput-total-in-value", "children"),
+    Output("throughput-total-out-value", "children"),
+    Output("throughput-overflow-value", "children"),
+    Output("throughput-avg-in-title", "children"),
+    Output("throughput-avg-in-value", "children"),
+    Output("throughput-avg-out-title", "children"),
+    Output("throughput-avg-out-value", "children"),
+    Output("throughput-in-graph", "figure"),
+    Output("throughput-out-graph", "figure"),
+    Input("throughput-series", "data"),
+    Input("throughput-zoom-series", "data"),
+    Input("throughput-bin-size", "value")
+)
@@ -1,87 +1,308 @@
-import requests
-from dash import Output, Input, State, callback, html
-import dash_bootstrap_components as dbc
+import json
+from dash import Output, Input, State, Patch, callback, dcc, html, no_update
+from config import ConfigData
 from utils.volume_utils import (
+    distribution_arrays,
+    distribution_stats,
+    cached_histogram_kde,
+    cached_joint_distributions,
+    joint_bin_edges,
+    kpi_values,
+    generate_heatmap,
+    generate_box_class_chart,
     generate_bar_chart,
+    generate_kde_chart,
     generate_normal_chart,
+    generate_stats_rows,
     generate_stats_table,
-    generate_kpi_card
+    generate_kpi_row
 )
+from utils.volume_live import live_volume, live_joint, window_key
+from utils.api_client import cached_post_json
+from utils.background import background_callback_manager
+from utils.cache import window_is_live
+from components.loading import running_outputs
 
-# API_URL = "https://backend-vanderlande-3jss.onrender.com/volume"  # Change to your backend URL
-API_URL = "http://127.0.0.1:8000/volume" # Local development URL
+DIMENSIONS = ("height", "width", "length")
+TRACE_DATA = ("x", "y", "z", "text")
+
+
+def _window_payload(date, start_time, end_time):
+    return {
+        "date": date,
+        "start_time": start_time,
+        "end_time": end_time
+    }
+
+
+def _kind(kind, chart):
+    """The chart kind if chart holds a graph, None for a "no data" message."""
+    return kind if isinstance(chart.children, dcc.Graph) else None
+
+
+def _component(patch, *path):
+    """Walks a Patch down nested children: an int indexes a children list, None takes the only child."""
+    for index in path:
+        patch = patch["props"]["children"]
+        if index is not None:
+            patch = patch[index]
+    return patch
+
+
+def _patch_chart(column, kind, chart, rendered_kind):
+    """Updates a rendered chart column.
+
+    When the column already shows the same kind of graph, only the trace
+    data and the title are sent; otherwise the chart is replaced.
+    """
+    if kind is None or kind != rendered_kind:
+        column["props"]["children"] = chart
+        return
+    # Serialized like the full render, so numeric arrays stay base64 typed arrays
+    figure = json.loads(chart.children.figure.to_json())
+    target = _component(column, None, None)["props"]["figure"]
+    for i, trace in enumerate(figure["data"]):
+        for prop in TRACE_DATA:
+            if prop in trace:
+                target["data"][i][prop] = trace[prop]
+    target["layout"]["title"]["text"] = figure["layout"]["title"]["text"]
+
+
+def _is_current(rendered, date, start_time, end_time):
+    """True if rendered is a live render of the window the controls select now."""
+    return (
+        bool(rendered)
+        and rendered.get("revision") is not None
+        and rendered["window"] == window_key(_window_payload(date, start_time, end_time))
+    )
+
+
+def _volume_charts(payload, data, graph_type):
+    """(kind, chart) and distribution_stats per dimension for a "volume" response."""
+    # Extract data: each distribution converted to value/count arrays once
+    distributions = {name: data.get(f"{name}_distribution", {}) for name in DIMENSIONS}
+    normal_stats = data.get("normal_distribution", {})
+
+    charts, stats = {}, {}
+    for name, data_dict in distributions.items():
+        values, counts = distribution_arrays(data_dict)
+        label = name.capitalize()
+        if graph_type == "hist":
+            kind, chart = "hist", generate_bar_chart(data_dict, f"{label} Distribution", f"{label} (mm)")
+        elif data_dict:
+            kde = cached_histogram_kde(payload, name, values, counts)
+            kind, chart = "kde", generate_kde_chart(kde, f"{label} Density", f"{label} (mm)")
+        else:
+            # No histogram for this window: fall back to the backend's Gaussian fit
+            kind, chart = "normal", generate_normal_chart(
+                normal_stats.get(name, {}), f"{label} Normal Distribution", f"{label} (mm)"
+            )
+        charts[name] = (_kind(kind, chart), chart)
+
+        # Statistics and KPI threshold counts, in one vectorized pass per dimension
+        thresholds = [(op, t) for dim, op, t, _ in ConfigData.VOLUME_KPI_THRESHOLDS if dim == name]
+        stats[name] = distribution_stats(values, counts, thresholds)
+    return charts, stats
+
+
+def _stats_by_label(stats):
+    return {f"{name.capitalize()} (mm)": stats[name] for name in DIMENSIONS}
 
 
 @callback(
     Output("volume-graphs-output", "children"),
+    Output("volume-rendered", "data"),
+    Output("volume-interval", "disabled"),
     Input("volume-date-picker", "date"),
     Input("volume-start-time", "value"),
     Input("volume-end-time", "value"),
     Input("volume-graph-type", "value"),
-    prevent_initial_call=False
+    prevent_initial_call=False,
+    background=True,
+    manager=background_callback_manager,
+    running=running_outputs("volume-loading"),
+    cancel=[Input("url", "pathname")]
 )
 def update_volume_dashboard(date, start_time, end_time, graph_type):
-    """Fetch data from backend and update graphs, table, and KPIs."""
+    """Fetch data from backend and update graphs, table, and KPIs.
+
+    Live windows are served from running totals (utils.volume_live) and
+    enable volume-interval, which then patches the rendered dashboard.
+    """
+    payload = _window_payload(date, start_time, end_time)
+    live = window_is_live(payload)
     try:
-        payload = {
-            "date": date,
-            "start_time": start_time,
-            "end_time": end_time
-        }
-        response = requests.post(API_URL, json=payload, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        if live:
+            entry = live_volume(payload, max_age=ConfigData.VOLUME_REFRESH_MIN_AGE)
+            data, revision = entry["state"], entry["revision"]
+        else:
+            data, revision = cached_post_json("volume", payload), None
     except Exception as e:
-        return html.Div(f"Error fetching data: {e}", className="text-danger")
+        return html.Div(f"Error fetching data: {e}", className="text-danger"), None, True
 
-    # Extract data
-    height_data = data.get("height_distribution", {})
-    width_data = data.get("width_distribution", {})
-    length_data = data.get("length_distribution", {})
-    normal_stats = data.get("normal_distribution", {})
-
-    # Row 2 - Graphs
-    if graph_type == "hist":
-        h_chart = generate_bar_chart(height_data, "Height Distribution", "Height (mm)")
-        w_chart = generate_bar_chart(width_data, "Width Distribution", "Width (mm)")
-        l_chart = generate_bar_chart(length_data, "Length Distribution", "Length (mm)")
-    else:
-        h_chart = generate_normal_chart(normal_stats.get("height", {}), "Height Normal Distribution", "Height (mm)")
-        w_chart = generate_normal_chart(normal_stats.get("width", {}), "Width Normal Distribution", "Width (mm)")
-        l_chart = generate_normal_chart(normal_stats.get("length", {}), "Length Normal Distribution", "Length (mm)")
+    charts, stats = _volume_charts(payload, data, graph_type)
 
     # Row 3 - Stats table
-    stats_table = generate_stats_table(height_data, width_data, length_data)
-
-    # Row 4 - KPIs (from frontend calculations)
-    total_parcels = sum(length_data.values()) if length_data else 0
-    under_400_count = sum(count for length, count in length_data.items() if 0 < float(length) <= 400)
-    above_600_count = sum(count for length, count in length_data.items() if float(length) >= 600)
-
-    under_400_pct = round((under_400_count / total_parcels) * 100, 2) if total_parcels else 0
-    above_600_pct = round((above_600_count / total_parcels) * 100, 2) if total_parcels else 0
-
-    kpi_row = html.Div([
-        dbc.Col(generate_kpi_card(
-            "Allocated Length ≤ 400 mm",
-            under_400_count,
-            under_400_pct,
-            color="#28a745"  # green
-        ), width=6),
-        dbc.Col(generate_kpi_card(
-            "Allocated Length ≥ 600 mm",
-            above_600_count,
-            above_600_pct,
-            color="#dc3545"  # red
-        ), width=6)
-    ], className="row mb-4")
-
-    return html.Div([
+    stats_table = generate_stats_table(_stats_by_label(stats))
+
+    # Row 4 - KPIs
+    kpi_row = generate_kpi_row(stats, ConfigData.VOLUME_KPI_THRESHOLDS)
+
+    # Row 2 - Graphs; the structure is what refresh_volume_dashboard patches
+    children = html.Div([
         html.Div(className="row", children=[
-            html.Div(h_chart, className="col-md-4"),
-            html.Div(w_chart, className="col-md-4"),
-            html.Div(l_chart, className="col-md-4"),
+            html.Div(charts[name][1], className="col-md-4") for name in DIMENSIONS
         ]),
         html.Div(className="mt-4", children=stats_table),
         kpi_row
     ])
+    rendered = {
+        "window": window_key(payload),
+        "graph_type": graph_type,
+        "revision": revision,
+        "charts": {name: kind for name, (kind, _) in charts.items()},
+    }
+    return children, rendered, not live
+
+
+@callback(
+    Output("volume-graphs-output", "children", allow_duplicate=True),
+    Output("volume-rendered", "data", allow_duplicate=True),
+    Input("volume-interval", "n_intervals"),
+    State("volume-rendered", "data"),
+    State("volume-date-picker", "date"),
+    State("volume-start-time", "value"),
+    State("volume-end-time", "value"),
+    State("volume-graph-type", "value"),
+    prevent_initial_call=True,
+    background=True,
+    manager=background_callback_manager,
+    # A render for new controls supersedes the refresh
+    cancel=[
+        Input("url", "pathname"),
+        Input("volume-date-picker", "date"),
+        Input("volume-start-time", "value"),
+        Input("volume-end-time", "value"),
+        Input("volume-graph-type", "value"),
+    ]
+)
+def refresh_volume_dashboard(n_intervals, rendered, date, start_time, end_time, graph_type):
+    """Adds the scans since the last refresh and patches the changed figures, table cells and KPI texts."""
+    if not _is_current(rendered, date, start_time, end_time) or rendered["graph_type"] != graph_type:
+        return no_update, no_update
+    payload = _window_payload(*rendered["window"])
+    try:
+        entry = live_volume(payload, max_age=ConfigData.VOLUME_REFRESH_MIN_AGE)
+    except Exception:
+        # Keep showing the last totals; the next tick retries
+        return no_update, no_update
+    if entry["revision"] == rendered["revision"]:
+        return no_update, no_update
+
+    charts, stats = _volume_charts(payload, entry["state"], rendered["graph_type"])
+    patch = Patch()
+    for column, name in enumerate(DIMENSIONS):
+        kind, chart = charts[name]
+        _patch_chart(_component(patch, 0, column), kind, chart, rendered["charts"].get(name))
+    _component(patch, 1, None, 1)["props"]["children"] = generate_stats_rows(_stats_by_label(stats))
+    for card, (count, pct) in enumerate(kpi_values(stats, ConfigData.VOLUME_KPI_THRESHOLDS)):
+        body = _component(patch, 2, card, None, None)
+        body["props"]["children"][1]["props"]["children"] = f"{count}"
+        body["props"]["children"][2]["props"]["children"] = f"{pct:.2f} %"
+
+    rendered = {
+        **rendered,
+        "revision": entry["revision"],
+        "charts": {name: kind for name, (kind, _) in charts.items()},
+    }
+    return patch, rendered
+
+
+def _joint_charts(binned):
+    """(kind, chart) for the joint heatmaps and the box-class breakdown."""
+    dimension_edges, fill_edges, box_edges = joint_bin_edges()
+    charts = [
+        ("heatmap", generate_heatmap(
+            binned["length_width"], dimension_edges, dimension_edges,
+            "Length × Width", "Length (mm)", "Width (mm)"
+        )),
+        ("heatmap", generate_heatmap(
+            binned["box_fill"], box_edges, fill_edges,
+            "Box Volume × Fill Ratio", "Box volume", "Real / box volume", log_x=True
+        )),
+        ("bar", generate_box_class_chart(binned["box_classes"])),
+    ]
+    return [(_kind(kind, chart), chart) for kind, chart in charts]
+
+
+@callback(
+    Output("volume-joint-output", "children"),
+    Output("volume-joint-rendered", "data"),
+    Input("volume-date-picker", "date"),
+    Input("volume-start-time", "value"),
+    Input("volume-end-time", "value"),
+    prevent_initial_call=False,
+    background=True,
+    manager=background_callback_manager,
+    running=running_outputs("volume-joint-loading"),
+    cancel=[Input("url", "pathname")]
+)
+def update_volume_joint(date, start_time, end_time):
+    """Joint dimension heatmaps and box-class breakdown, binned from per-scan data."""
+    payload = _window_payload(date, start_time, end_time)
+    try:
+        if window_is_live(payload):
+            entry = live_joint(payload, max_age=ConfigData.VOLUME_REFRESH_MIN_AGE)
+            binned, revision = entry["state"], entry["revision"]
+        else:
+            binned, revision = cached_joint_distributions(payload), None
+    except Exception as e:
+        return html.Div(f"Error fetching scan data: {e}", className="text-danger"), None
+
+    charts = _joint_charts(binned)
+    children = html.Div(className="row", children=[
+        html.Div(chart, className="col-md-4") for _, chart in charts
+    ])
+    rendered = {
+        "window": window_key(payload),
+        "revision": revision,
+        "charts": [kind for kind, _ in charts],
+    }
+    return children, rendered
+
+
+@callback(
+    Output("volume-joint-output", "children", allow_duplicate=True),
+    Output("volume-joint-rendered", "data", allow_duplicate=True),
+    Input("volume-interval", "n_intervals"),
+    State("volume-joint-rendered", "data"),
+    State("volume-date-picker", "date"),
+    State("volume-start-time", "value"),
+    State("volume-end-time", "value"),
+    prevent_initial_call=True,
+    background=True,
+    manager=background_callback_manager,
+    cancel=[
+        Input("url", "pathname"),
+        Input("volume-date-picker", "date"),
+        Input("volume-start-time", "value"),
+        Input("volume-end-time", "value"),
+    ]
+)
+def refresh_volume_joint(n_intervals, rendered, date, start_time, end_time):
+    """Adds the binned scans since the last refresh and patches the heatmap and bar data."""
+    if not _is_current(rendered, date, start_time, end_time):
+        return no_update, no_update
+    try:
+        entry = live_joint(_window_payload(*rendered["window"]), max_age=ConfigData.VOLUME_REFRESH_MIN_AGE)
+    except Exception:
+        return no_update, no_update
+    if entry["revision"] == rendered["revision"]:
+        return no_update, no_update
+
+    charts = _joint_charts(entry["state"])
+    patch = Patch()
+    for column, ((kind, chart), rendered_kind) in enumerate(zip(charts, rendered["charts"])):
+        _patch_chart(_component(patch, column), kind, chart, rendered_kind)
+    rendered = {**rendered, "revision": entry["revision"], "charts": [kind for kind, _ in charts]}
+    return patch, rendered
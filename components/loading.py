@@ -0,0 +1,21 @@
+# loading.py
+import dash_bootstrap_components as dbc
+from dash import html, Output
+
+SHOW = {"display": "flex"}
+HIDE = {"display": "none"}
+
+
+def loading_indicator(component_id, text="Loading data..."):
+    """Spinner toggled through the `running` argument of background callbacks."""
+    return html.Div([
+        dbc.Spinner(size="sm", color="primary"),
+        html.Span(text, className="ms-2 text-muted small")
+    ], id=component_id, className="align-items-center my-2", style=HIDE)
+
+
+def running_outputs(component_id, *disabled_ids):
+    """`running` entries that show a loading indicator and disable controls."""
+    return [(Output(component_id, "style"), SHOW, HIDE)] + [
+        (Output(control_id, "disabled"), True, False) for control_id in disabled_ids
+    ]
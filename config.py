@@ -1,5 +1,181 @@
+import os
+import stat
+import tempfile
+
+
+def _private_temp_dir(name):
+    """Creates (if needed) and returns a directory under the temp dir that only
+    this user can access.
+
+    The temp dir is shared with other local users, who could otherwise plant
+    files there for the dashboard to load (cache pickles, parcel data).
+    """
+    if not hasattr(os, "getuid"):  # Windows: the temp dir is per user
+        return os.path.join(tempfile.gettempdir(), name)
+    path = os.path.join(tempfile.gettempdir(), f"{name}-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f"{path} is not a directory owned by this user; remove it or configure another path")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
 class ConfigData:
 
+ # Backend API: base URL is taken from the environment so deployments don't
+ # need code edits (defaults to the local development backend).
+ BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+
+ # (connect, read) timeouts in seconds, per backend endpoint
+ BACKEND_TIMEOUTS = {
+    "summary": (3.05, 10),
+    "throughput": (3.05, 15),
+    "volume": (3.05, 10),
+    "parcel-journey": (3.05, 20),
+    "volume-scans": (3.05, 30),
+ }
+ BACKEND_DEFAULT_TIMEOUT = (3.05, 10)
+
+ # Connection pool and retry policy shared by all pages
+ BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "20"))
+ BACKEND_MAX_RETRIES = int(os.getenv("BACKEND_MAX_RETRIES", "2"))
+ BACKEND_RETRY_BACKOFF = float(os.getenv("BACKEND_RETRY_BACKOFF", "0.3"))
+
+ # Response cache: max entries, and (historical, live) TTLs in seconds per
+ # endpoint. Windows that have ended are stable; windows including "now" are
+ # still filling up and are only cached for a few seconds.
+ BACKEND_CACHE_SIZE = int(os.getenv("BACKEND_CACHE_SIZE", "512"))
+ BACKEND_CACHE_TTLS = {
+    "summary": (3600, 5),
+    "throughput": (3600, 5),
+    "volume": (3600, 5),
+ }
+
+ # Throughput date-range mode: per-day chunks fetched concurrently
+ THROUGHPUT_FETCH_WORKERS = int(os.getenv("THROUGHPUT_FETCH_WORKERS", "4"))
+ THROUGHPUT_MAX_RANGE_DAYS = 31
+
+ # Local parcel records (FG.json, or a JSON Lines file that is appended to)
+ PARCEL_DATA_PATH = os.getenv("PARCEL_DATA_PATH", "FG.json")
+ PARCEL_INDEX_REFRESH_SECONDS = 30
+ PARCEL_SEARCH_SUGGESTIONS = 10
+
+ # Columnar, memory-mapped copy of PARCEL_DATA_PATH (see utils/parcel_store.py)
+ PARCEL_STORE_DIR = os.getenv("PARCEL_STORE_DIR") or _private_temp_dir("parcel-dashboard-store")
+
+ # Where parcel journey searches are answered: "backend", or "local" to use
+ # the in-memory index over PARCEL_DATA_PATH (offline mode)
+ PARCEL_JOURNEY_SOURCE = os.getenv("PARCEL_JOURNEY_SOURCE", "backend")
+
+ # Seconds a parcel journey search result stays available for paging
+ PARCEL_JOURNEY_RESULT_TTL = 1800
+ PARCEL_JOURNEY_PAGE_SIZE = 10
+
+ # Bulk lookup: IDs resolved concurrently through a bounded pool
+ PARCEL_JOURNEY_BULK_WORKERS = int(os.getenv("PARCEL_JOURNEY_BULK_WORKERS", "8"))
+ PARCEL_JOURNEY_BULK_MAX_IDS = 2000
+
+ # Volume page KPI cards: share of parcels per dimension threshold, as
+ # (dimension, operator "<=" or ">=", threshold in mm, card color). "<="
+ # counts scanned parcels (dimension > 0) up to the threshold.
+ VOLUME_KPI_THRESHOLDS = [
+    ("length", "<=", 400, "#28a745"),
+    ("length", ">=", 600, "#dc3545"),
+ ]
+
+ # Volume page joint distributions, binned from per-scan dimensions: from the
+ # backend "volume-scans" endpoint (columnar arrays), or "local" to use the
+ # parcel store over PARCEL_DATA_PATH (offline mode, no time window).
+ # Bin edges are fixed so binned counts from different fetches can be added.
+ VOLUME_SCANS_SOURCE = os.getenv("VOLUME_SCANS_SOURCE", "backend")
+ VOLUME_HEATMAP_BIN_MM = 20
+ VOLUME_HEATMAP_MAX_MM = 1200
+ VOLUME_FILL_RATIO_BINS = 24          # fill ratio 0 to 1.2
+ VOLUME_BOX_VOLUME_LOG10_RANGE = (3, 9)
+ VOLUME_BOX_VOLUME_BINS = 30
+
+ # Carton classes as (name, length, width, height) in mm, smallest first.
+ # A parcel is counted in the first class it fits in, in any orientation.
+ VOLUME_BOX_CLASSES = [
+    ("XS", 250, 175, 100),
+    ("S", 350, 250, 150),
+    ("M", 450, 350, 250),
+    ("L", 600, 400, 400),
+    ("XL", 800, 600, 600),
+ ]
+
+ # Live volume windows refresh every VOLUME_REFRESH_INTERVAL_MS by fetching
+ # only the scans since the backend's last "as_of" ("since" in the payload)
+ # and adding them to running totals kept for VOLUME_LIVE_TTL seconds; a
+ # response that does not echo "since" replaces the totals. A refresh newer
+ # than VOLUME_REFRESH_MIN_AGE seconds (e.g. from another tab) is reused.
+ VOLUME_REFRESH_INTERVAL_MS = 30 * 1000
+ VOLUME_REFRESH_MIN_AGE = 10
+ VOLUME_LIVE_TTL = 6 * 3600
+
+ # Local disk cache backing the background callback manager (and the other
+ # caches below). The default is private to the user running the dashboard.
+ BACKGROUND_CACHE_DIR = os.getenv("BACKGROUND_CACHE_DIR") or _private_temp_dir("parcel-dashboard-cache")
+
+ # Optional directory used to coalesce and share backend responses across
+ # processes on this host: gunicorn workers and background callback jobs,
+ # which run in their own processes and can't see the in-process response
+ # cache. Off unless set; it should not be writable by other users.
+ BACKEND_SHARED_CACHE_DIR = os.getenv("BACKEND_SHARED_CACHE_DIR")
+
+ # Chatbot cache of generated code and summaries, keyed on the normalized
+ # question. Entries are evicted least-recently-used beyond the size limit
+ # (bytes) or after the TTL (seconds), and dropped when the schema changes.
+ # Questions that differ in wording are matched by embedding similarity when
+ # AZURE_OPENAI_EMBEDDING_DEPLOYMENT is set.
+ CHATBOT_CACHE_DIR = os.getenv("CHATBOT_CACHE_DIR", os.path.join(BACKGROUND_CACHE_DIR, "chatbot"))
+ CHATBOT_CACHE_SIZE_LIMIT = int(os.getenv("CHATBOT_CACHE_SIZE_LIMIT", str(64 * 1024 * 1024)))
+ CHATBOT_CACHE_TTL = 7 * 24 * 3600
+ CHATBOT_SIMILARITY_THRESHOLD = float(os.getenv("CHATBOT_SIMILARITY_THRESHOLD", "0.95"))
+ CHATBOT_SIMILARITY_MAX_ENTRIES = 2000
+
+ # Generated chatbot code runs in a pool of pre-started worker processes,
+ # each limited to CHATBOT_SANDBOX_MEMORY_MB of memory beyond the loaded parcel
+ # data and CHATBOT_SANDBOX_TIMEOUT seconds per question. Results larger than
+ # CHATBOT_SANDBOX_MAX_RESULT_BYTES come back as a truncated repr. A question
+ # waits up to CHATBOT_SANDBOX_STARTUP_TIMEOUT seconds for a worker that is
+ # still loading the parcel data (the first one loads it for all).
+ CHATBOT_SANDBOX_WORKERS = int(os.getenv("CHATBOT_SANDBOX_WORKERS", "2"))
+ CHATBOT_SANDBOX_TIMEOUT = float(os.getenv("CHATBOT_SANDBOX_TIMEOUT", "20"))
+ CHATBOT_SANDBOX_STARTUP_TIMEOUT = float(os.getenv("CHATBOT_SANDBOX_STARTUP_TIMEOUT", "180"))
+ CHATBOT_SANDBOX_MEMORY_MB = int(os.getenv("CHATBOT_SANDBOX_MEMORY_MB", "1024"))
+ CHATBOT_SANDBOX_MAX_RESULT_BYTES = 1024 * 1024
+
+ # Chat history is kept server-side per browser session: at most
+ # CHATBOT_HISTORY_MAX_ENTRIES messages (older ones are compacted away),
+ # expiring after CHATBOT_HISTORY_TTL seconds of inactivity. Answers are
+ # streamed to the page by polling every CHATBOT_STREAM_INTERVAL_MS.
+ CHATBOT_HISTORY_MAX_ENTRIES = 100
+ CHATBOT_HISTORY_TTL = 24 * 3600
+ CHATBOT_STREAM_INTERVAL_MS = 300
+
+ # What generated chatbot code works on: "dataframe" (the flattened `df` and
+ # `events` tables described by DATAFRAME_SCHEMA) or "records" (`data`, the
+ # raw list of dicts described by TABLE_SCHEMA)
+ CHATBOT_DATA_REPRESENTATION = os.getenv("CHATBOT_DATA_REPRESENTATION", "dataframe")
+
+ # Chat pipeline: at most CHATBOT_MAX_CONCURRENT questions answered at once
+ # per worker (the rest queue), and LLM requests rate limited by a token
+ # bucket shared by the worker
+ CHATBOT_MAX_CONCURRENT = int(os.getenv("CHATBOT_MAX_CONCURRENT", "4"))
+ CHATBOT_LLM_REQUESTS_PER_MINUTE = int(os.getenv("CHATBOT_LLM_REQUESTS_PER_MINUTE", "60"))
+ CHATBOT_LLM_BURST = int(os.getenv("CHATBOT_LLM_BURST", "5"))
+
+ # LLM backend: "azure", or "stub" to replay canned responses (see
+ # utils/chatbot_stub.py) with the given latency to first token and between
+ # tokens, in seconds
+ CHATBOT_LLM = os.getenv("CHATBOT_LLM", "azure")
+ CHATBOT_STUB_RESPONSES = os.getenv("CHATBOT_STUB_RESPONSES", "")
+ CHATBOT_STUB_LATENCY = float(os.getenv("CHATBOT_STUB_LATENCY", "1.0"))
+ CHATBOT_STUB_TOKEN_DELAY = float(os.getenv("CHATBOT_STUB_TOKEN_DELAY", "0.02"))
+
  TABLE_SCHEMA = '''
    
     "hostId": "string",
@@ -41,6 +217,42 @@ class ConfigData:
  '''
 
 
+ DATAFRAME_SCHEMA = '''
+
+    df: pandas DataFrame, one row per parcel (nested fields flattened)
+        "hostId": string
+        "pic": Int64
+        "status": category
+        "Registered_location": category
+        "customer_location": category
+        "sort_strategy": category
+        "destinations": list of string
+        "barcodes": list of string          (from barcode_data)
+        "barcode_count": Int64              (from barcode_data)
+        "barcode_state": Int64              (from barcode_data)
+        "barcode_error": boolean
+        "alibi_id": string
+        "volume_state": Int64               (from volume_data)
+        "length": Int64                     (from volume_data)
+        "width": Int64                      (from volume_data)
+        "height": Int64                     (from volume_data)
+        "box_volume": Int64                 (from volume_data)
+        "real_volume": Int64                (from volume_data)
+        "volume_error": boolean
+        "actual_destination": category
+        "sort_code": Int64
+        "exit_state": category
+
+    events: pandas DataFrame, one row per parcel event
+        "parcel": int       (row label of the parcel in df)
+        "hostId": string
+        "seq": int          (1 = first event of the parcel)
+        "type": category
+        "raw": string
+
+ '''
+
+
  SCHEMA_DESCRIPTION = '''
 
    Key descriptions:
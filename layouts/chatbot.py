@@ -1,208 +1,210 @@
-import json
-import os
-import re
-from dotenv import load_dotenv
-from dash import html, dcc, Output, Input, State
+import threading
+import time
+import uuid
+from dash import html, dcc, Output, Input, State, Patch, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from langchain_openai import AzureChatOpenAI
-from langchain.prompts import PromptTemplate
 from config import ConfigData
-import markdown
-from dash import no_update
+from utils.chatbot_sandbox import get_sandbox
+from utils.chatbot_pipeline import get_chat_engine, get_chat_pipeline
+from utils import chatbot_intents
+from utils.chat_sessions import get_history, append_history, set_stream, read_stream, clear_stream, request_cancel
 
-# === Load environment variables ===
-load_dotenv()
+# === Warmup ===
+_warmup_started = False
 
-# === Load JSON data ===
-with open("FG.json") as f:
-    data = json.load(f)
 
-# === Initialize LLM ===
-llm = AzureChatOpenAI(
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-    openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-)
+def _warm_up():
+    chatbot_intents.warm_aggregates()
+    get_sandbox()
+    get_chat_pipeline()
+    get_chat_engine()
 
-# === Prompts ===
-table_schema = ConfigData.TABLE_SCHEMA
-schema_description = ConfigData.SCHEMA_DESCRIPTION
 
-code_prompt = PromptTemplate(
-    template="""
-You are an expert Python developer working with structured JSON data.
+def warm_chat_engine():
+    """Starts initializing the chatbot in the background (first visit to /chatbot)."""
+    global _warmup_started
+    if not _warmup_started:
+        _warmup_started = True
+        threading.Thread(target=_warm_up, name="chatbot-warmup", daemon=True).start()
 
-The data is loaded in a Python list of dictionaries stored in a variable called `data`.
 
-Your task:
-- Read the user question.
-- Identify the relevant fields from the schema.
-- Write a **pure Python code snippet** that stores the answer in a variable named `result` and then prints it using `print(result)`.
-
-⚠️ Constraints:
-- Do NOT return any markdown (like ```python).
-- Do NOT include comments or extra text.
-- Your output must be **only Python code** using `result = ...` followed by `print(result)`
-
-Table Schema:
-{table_schema}
-
-Schema Description:
-{schema_description}
-
-User Question: {user_question}
-""",
-    input_variables=["user_question"],
-)
-
-summary_prompt = PromptTemplate(
-    template="""
-You are a helpful assistant that summarizes code results in natural language.
-
-Given:
-- The user's original question
-- The Python code that was generated and executed
-- The value of the variable `result` after execution
-
-You can refer following the following mapping to number to its meaning and when the filds are valid and values. you can consider only fileds that are metioned in genarted code or result to mapping 
-mapping:
-{schema_description}
-Your task:
-- Return a clear, helpful natural language answer to the user's question based on the result.
-- Keep it simple structured and non-technical.
-
-User Question:
-{user_question}
+# === Chat UI helper ===
+def chat_bubble(entry):
+    role = entry["role"]
+    text = entry["text"]
+
+    if role == "bot":
+        return html.Div([
+            html.Strong("Assistant:", style={"color": "#28a745"}),
+            html.Div(dcc.Markdown(text, dangerously_allow_html=True)),
+            html.Small(entry["path"], className="text-muted") if entry.get("path") else None,
+        ], style={
+            "marginBottom": "10px",
+            "backgroundColor": "#e9f7ef",
+            "padding": "10px",
+            "borderRadius": "5px"
+        })
+    return html.Div([
+        html.Strong("You:", style={"color": "#007bff"}),
+        html.Div(text, style={"paddingLeft": "10px"})
+    ], style={"marginBottom": "10px"})
 
-Generated Code:
-{code}
 
-Execution Result (stored in variable `result`):
-{result}
-""",
-    input_variables=["user_question", "code", "result", "schema_description"],
-)
+def format_chat(history):
+    return [chat_bubble(entry) for entry in history]
 
-# === Bind chains ===
-code_chain = code_prompt.partial(
-    table_schema=table_schema,
-    schema_description=schema_description,
-) | llm
 
-summary_chain = summary_prompt | llm
+def live_bubble(state):
+    """Bubble for the answer in progress: its status line and the text streamed so far."""
+    return html.Div([
+        html.Strong("Assistant:", style={"color": "#28a745"}),
+        html.Div(dcc.Markdown(state.get("text") or "", dangerously_allow_html=True)),
+        html.Div([
+            dbc.Spinner(size="sm", color="primary"),
+            html.Span(state.get("status") or "Writing...", className="ms-2 text-muted small"),
+        ], className="d-flex align-items-center"),
+    ], style={
+        "marginBottom": "10px",
+        "backgroundColor": "#f4fbf6",
+        "padding": "10px",
+        "borderRadius": "5px"
+    })
 
 
-# === Chat UI helper ===
-def format_chat(history):
-    chat_bubbles = []
-    for entry in history:
-        role = entry["role"]
-        text = entry["text"]
-
-        if role == "bot":
-            chat_bubbles.append(
-                html.Div([
-                    html.Strong("Assistant:", style={"color": "#28a745"}),
-                    html.Div(dcc.Markdown(text, dangerously_allow_html=True))
-                ], style={
-                    "marginBottom": "10px",
-                    "backgroundColor": "#e9f7ef",
-                    "padding": "10px",
-                    "borderRadius": "5px"
-                })
-            )
-        else:
-            chat_bubbles.append(
-                html.Div([
-                    html.Strong("You:", style={"color": "#007bff"}),
-                    html.Div(text, style={"paddingLeft": "10px"})
-                ], style={"marginBottom": "10px"})
-            )
-    return chat_bubbles
+# === Layout for Chatbot Page ===
+def chatbot_layout():
+    """Chat page; the session id persists for the browser tab, so history survives navigation."""
+    return dbc.Container([
+        html.H2("📦 Smart Parcel Chat Assistant", className="mt-3 mb-2 text-center text-primary"),
 
+        dcc.Store(id="chat-session", data=uuid.uuid4().hex, storage_type="session"),
+        dcc.Store(id="chat-stream-seq", data=0),
+        dcc.Interval(id="chat-stream-interval", interval=ConfigData.CHATBOT_STREAM_INTERVAL_MS, disabled=True),
 
-# === Layout for Chatbot Page ===
-chatbot_layout = dbc.Container([
-    html.H2("📦 Smart Parcel Chat Assistant", className="mt-3 mb-2 text-center text-primary"),
-
-    dcc.Store(id="chat-history", data=[]),
-
-    html.Div([
-        html.Div(id="chat-window", style={
-            "height": "70vh",
-            "overflowY": "auto",
-            "border": "1px solid #ddd",
-            "padding": "15px",
-            "borderRadius": "10px",
-            "backgroundColor": "#fff",
-        }),
         html.Div([
-            dbc.Row([
-                dbc.Col([
-                    dcc.Input(
-                        id="question-input",
-                        placeholder="Ask a question about parcel logs...",
-                        style={"width": "100%", "padding": "10px", "fontSize": "16px"},
-                    )
-                ], width=10),
-                dbc.Col([
-                    dbc.Button("Send", id="run-button", color="primary", className="w-100")
-                ], width=2)
-            ], className="g-2")
-        ], style={
-            "position": "sticky",
-            "bottom": "0",
-            "backgroundColor": "#f8f9fa",
-            "padding": "10px",
-            "zIndex": "999"
-        })
-    ])
-], fluid=True)
+            html.Div([
+                html.Div(id="chat-window"),
+                html.Div(id="chat-live"),
+            ], style={
+                "height": "70vh",
+                "overflowY": "auto",
+                "border": "1px solid #ddd",
+                "padding": "15px",
+                "borderRadius": "10px",
+                "backgroundColor": "#fff",
+            }),
+            html.Div([
+                dbc.Row([
+                    dbc.Col([
+                        dcc.Input(
+                            id="question-input",
+                            placeholder="Ask a question about parcel logs...",
+                            style={"width": "100%", "padding": "10px", "fontSize": "16px"},
+                        )
+                    ], width=8),
+                    dbc.Col([
+                        dbc.Button("Send", id="run-button", color="primary", className="w-100")
+                    ], width=2),
+                    dbc.Col([
+                        dbc.Button("Stop", id="stop-button", color="secondary", outline=True,
+                                   className="w-100", disabled=True)
+                    ], width=2)
+                ], className="g-2")
+            ], style={
+                "position": "sticky",
+                "bottom": "0",
+                "backgroundColor": "#f8f9fa",
+                "padding": "10px",
+                "zIndex": "999"
+            })
+        ])
+    ], fluid=True)
 
 
 # === Callback Registration ===
 def register_chatbot_callbacks(app):
     @app.callback(
         Output("chat-window", "children"),
-        Output("chat-history", "data"),
+        Input("chat-session", "data"),
+    )
+    def restore_chat(session_id):
+        history = get_history(session_id)
+        bubbles = format_chat(history["entries"])
+        if history["compacted"]:
+            bubbles.insert(0, html.Div(f"{history['compacted']} earlier messages not shown.",
+                                       className="text-muted small text-center mb-2"))
+        return bubbles
+
+    @app.callback(
+        Output("chat-window", "children", allow_duplicate=True),
+        Output("chat-live", "children"),
+        Output("question-input", "value"),
+        Output("chat-stream-interval", "disabled"),
+        Output("run-button", "disabled"),
+        Output("stop-button", "disabled"),
         Input("run-button", "n_clicks"),
         State("question-input", "value"),
-        State("chat-history", "data"),
+        State("chat-session", "data"),
         prevent_initial_call=True
     )
-    def handle_chat(n_clicks, question, history):
+    def handle_chat(n_clicks, question, session_id):
         if not question:
-            return html.Div("❗ Please enter a question."), history
-
-        # Step 1: Generate Python code
-        code_resp = code_chain.invoke({"user_question": question})
-        code = code_resp.content if hasattr(code_resp, "content") else code_resp.get("text", "")
-        code = re.sub(r"```(?:python)?", "", code).strip("` \n")
-
-        print("\n🔧 Generated Code from LLM:\n", code)
-
-        # Step 2: Execute code
-        local_vars = {"data": data}
-        try:
-            exec(code, {}, local_vars)
-            result = local_vars.get("result")
-        except Exception as e:
-            history.append({"role": "user", "text": question})
-            history.append({"role": "bot", "text": f"❌ Error executing code: {e}"})
-            return format_chat(history), history
-
-        # Step 3: Generate summary
-        summary_resp = summary_chain.invoke({
-            "user_question": question,
-            "code": code,
-            "result": result,
-            "schema_description": schema_description
-        })
-        summary = summary_resp.content if hasattr(summary_resp, "content") else summary_resp.get("text", "")
+            return no_update, html.Div("❗ Please enter a question."), no_update, True, False, True
+
+        user_entry = {"role": "user", "text": question}
+        window = Patch()
+        window.append(chat_bubble(user_entry))
+
+        # Fast path: common counts and rates from precomputed aggregates
+        started = time.perf_counter()
+        fast = chatbot_intents.answer(question)
+        if fast is not None:
+            intent, _, text = fast
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"\n⚡ Fast path {intent} answered in {elapsed_ms:.1f} ms")
+            bot_entry = {"role": "bot", "text": text,
+                         "path": f"⚡ Answered from parcel aggregates in {elapsed_ms:.0f} ms"}
+            append_history(session_id, user_entry, bot_entry)
+            window.append(chat_bubble(bot_entry))
+            return window, None, "", True, False, True
+
+        # LLM path: queued on the chat pipeline, the page polls for streamed progress
+        append_history(session_id, user_entry)
+        clear_stream(session_id)
+        set_stream(session_id, status="Thinking...", text="")
+        get_chat_pipeline().submit(session_id, question, started)
+        return window, live_bubble({"status": "Thinking..."}), "", False, True, False
 
-        # Update history
-        history.append({"role": "user", "text": question})
-        history.append({"role": "bot", "text": f"💬 Summary:\n\n{summary}"})
+    @app.callback(
+        Output("chat-window", "children", allow_duplicate=True),
+        Output("chat-live", "children", allow_duplicate=True),
+        Output("chat-stream-seq", "data"),
+        Output("chat-stream-interval", "disabled", allow_duplicate=True),
+        Output("run-button", "disabled", allow_duplicate=True),
+        Output("stop-button", "disabled", allow_duplicate=True),
+        Input("chat-stream-interval", "n_intervals"),
+        State("chat-session", "data"),
+        State("chat-stream-seq", "data"),
+        prevent_initial_call=True
+    )
+    def poll_chat_stream(n_intervals, session_id, seq):
+        state = read_stream(session_id)
+        if state is None:
+            return no_update, None, 0, True, False, True
+        if state.get("done"):
+            window = Patch()
+            window.append(chat_bubble(state["entry"]))
+            return window, None, 0, True, False, True
+        if state["seq"] == seq:
+            raise PreventUpdate
+        return no_update, live_bubble(state), state["seq"], no_update, no_update, no_update
 
-        return format_chat(history), history
+    @app.callback(
+        Input("stop-button", "n_clicks"),
+        State("chat-session", "data"),
+        prevent_initial_call=True
+    )
+    def stop_chat(n_clicks, session_id):
+        # Flag read by the answering thread and the sandbox, whichever worker runs them
+        request_cancel(session_id)
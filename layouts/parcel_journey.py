@@ -1,6 +1,8 @@
-from dash import html, dcc
+from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
 import datetime
+from components.loading import loading_indicator, HIDE
+from config import ConfigData
 
 parcel_journey_layout = html.Div([
 
@@ -38,8 +40,11 @@ parcel_journey_layout = html.Div([
                 id='search-input',
                 placeholder="*",
                 type="text",
+                list='search-suggestions',
+                autocomplete="off",
                 className="w-100"
-            )
+            ),
+            html.Datalist(id='search-suggestions')
         ], width=2),
 
         dbc.Col([
@@ -85,7 +90,79 @@ parcel_journey_layout = html.Div([
         ], width=2)
     ], className="gy-2"),
 
+    # Bulk lookup: pasted list or CSV of IDs of the selected type
+    html.Details([
+        html.Summary("Bulk lookup"),
+        dbc.Row([
+            dbc.Col([
+                html.Small("IDs (one per line or comma separated)"),
+                dbc.Textarea(id='bulk-ids-input', rows=4, className="w-100")
+            ], width=6),
+            dbc.Col([
+                html.Small("or upload a CSV (first column)"),
+                dcc.Upload(
+                    id='bulk-ids-upload',
+                    children=html.Div(["Drag and drop or ", html.A("select a file")]),
+                    accept=".csv,.txt",
+                    className="bulk-upload"
+                )
+            ], width=4),
+            dbc.Col([
+                html.Small(" "),
+                dbc.Button("Bulk Lookup", id="bulk-lookup-btn", color="primary", className="mt-2 w-100")
+            ], width=2)
+        ], className="gy-2 mt-1"),
+        dbc.Row([
+            dbc.Col(dbc.Progress(id='bulk-lookup-progress', value=0, striped=True, animated=True), width=10),
+            dbc.Col(dbc.Button("Cancel", id="bulk-lookup-cancel-btn", color="secondary", size="sm"), width=2)
+        ], id='bulk-lookup-progress-row', className="mt-2 align-items-center", style=HIDE)
+    ], className="mt-3"),
+
+    loading_indicator("parcel-journey-loading", "Searching parcels..."),
+
+    # Id of the server-side result set being paged
+    dcc.Store(id='parcel-journey-query'),
+
+    # RAW logs already loaded this session, keyed by host id
+    dcc.Store(id='parcel-journey-raw-cache', storage_type='session', data={}),
+    dcc.Store(id='parcel-journey-raw-request'),
+
     # 🔽 Table Output Appears Here
-    html.Div(id='parcel-journey-output', className="mt-4")
+    html.Div(id='parcel-journey-output', className="mt-4"),
+
+    html.Div([
+        dash_table.DataTable(
+            id='parcel-journey-table',
+            columns=[],
+            data=[],
+            page_current=0,
+            page_size=ConfigData.PARCEL_JOURNEY_PAGE_SIZE,
+            page_action="custom",
+            sort_action="custom",
+            sort_mode="multi",
+            sort_by=[],
+            filter_action="custom",
+            cell_selectable=True,
+            filter_query="",
+            style_table={"overflowX": "auto", "border": "1px solid #dee2e6", "borderRadius": "6px"},
+            style_cell={
+                "textAlign": "left",
+                "padding": "6px",
+                "borderBottom": "1px solid #dee2e6",
+            },
+            style_header={
+                "backgroundColor": "#f8f9fa",
+                "fontWeight": "bold",
+                "borderBottom": "2px solid #dee2e6",
+            },
+            style_data={"backgroundColor": "#ffffff"}
+        ),
+        html.Hr(),
+        html.Details([
+            html.Summary("RAW Logs", id='parcel-journey-raw-summary'),
+            html.Pre("Select a row to load its RAW log.", id='parcel-journey-raw-text',
+                     style={"whiteSpace": "pre-wrap"})
+        ], id='parcel-journey-raw-details')
+    ], id='parcel-journey-results', className="mt-4", style=HIDE)
 
 ], className="parcel-journey-tab")
@@ -2,6 +2,7 @@ import datetime
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 from utils.summary_utils import generate_pie_chart_kpi
+from components.loading import loading_indicator
 
 summary_layout = dbc.Container([
     html.H2("Summary", className="summary-title"),
@@ -21,6 +22,7 @@ summary_layout = dbc.Container([
                 id="start-time",
                 type="time",
                 value="00:00",
+                debounce=600,
                 className="custom-time-picker"
             ), width=2
         ),
@@ -29,11 +31,17 @@ summary_layout = dbc.Container([
                 id="end-time",
                 type="time",
                 value="23:59",
+                debounce=600,
                 className="custom-time-picker"
             ), width=2
         ),
     ], className="kpi-input-row"),
 
+    # Last complete, valid time window (written client-side)
+    dcc.Store(id="summary-window", data={"start_time": "00:00", "end_time": "23:59"}),
+
+    loading_indicator("summary-loading"),
+
     html.Div(id="no-data-message", style={
         "color": "red", "fontWeight": "bold", "textAlign": "center", "marginTop": "10px"
     }),
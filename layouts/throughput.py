@@ -1,28 +1,51 @@
 import datetime
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from components.loading import loading_indicator, HIDE
+from utils.throughput_utils import generate_kpi_card, area_chart_graph, BIN_SIZES
+
+# HH:MM, checked by the browser and by assets/time_window.js
+TIME_PATTERN = r"([01]?[0-9]|2[0-3]):[0-5][0-9]"
 
 throughput_layout = dbc.Container([
     html.H2("Parcel Throughput", className="throughput-title"),
 
     dbc.Row([
-        dbc.Col(
-            dcc.DatePickerSingle(
-                id="throughput-date-picker",
-                date=datetime.date.today(),
-                display_format='YYYY-MM-DD',
-                className="throughput-date-picker"
-            ), width=3
-        ),
+        dbc.Col([
+            dbc.RadioItems(
+                id="throughput-date-mode",
+                options=[
+                    {"label": "Single day", "value": "single"},
+                    {"label": "Date range", "value": "range"}
+                ],
+                value="single",
+                inline=True,
+                className="mb-1"
+            ),
+            html.Div(
+                dcc.DatePickerSingle(
+                    id="throughput-date-picker",
+                    date=datetime.date.today(),
+                    display_format='YYYY-MM-DD',
+                    className="throughput-date-picker"
+                ), id="throughput-single-date"
+            ),
+            html.Div(
+                dcc.DatePickerRange(
+                    id="throughput-date-range",
+                    start_date=datetime.date.today() - datetime.timedelta(days=6),
+                    end_date=datetime.date.today(),
+                    display_format='YYYY-MM-DD',
+                    className="throughput-date-picker"
+                ), id="throughput-range-date", style=HIDE
+            )
+        ], width=3),
         dbc.Col(
             dcc.Dropdown(
                 id="throughput-bin-size",
                 options=[
-                    {"label": "1 min", "value": 1},
-                    {"label": "10 min", "value": 10},
-                    {"label": "20 min", "value": 20},
-                    {"label": "30 min", "value": 30},
-                    {"label": "1 hour", "value": 60}
+                    {"label": "1 hour" if size == 60 else f"{size} min", "value": size}
+                    for size in BIN_SIZES
                 ],
                 value=10,
                 clearable=False,
@@ -35,6 +58,8 @@ throughput_layout = dbc.Container([
                 type="text",
                 placeholder="HH:MM",
                 value="00:00",
+                pattern=TIME_PATTERN,
+                debounce=600,
                 className="throughput-time-input"
             ), width=2
         ),
@@ -44,15 +69,41 @@ throughput_layout = dbc.Container([
                 type="text",
                 placeholder="HH:MM",
                 value="23:59",
+                pattern=TIME_PATTERN,
+                debounce=600,
                 className="throughput-time-input"
             ), width=2
         ),
     ], className="mb-4"),
 
+    # Last complete, valid time window (written client-side)
+    dcc.Store(id="throughput-window", data={"start_time": "00:00", "end_time": "23:59"}),
+
+    loading_indicator("throughput-loading"),
+    html.Div(id="throughput-progress", className="small text-muted mb-2"),
+
+    # Series for the selected date/window (see build_display), plus the
+    # full-resolution refetch of a zoomed range
+    dcc.Store(id="throughput-series"),
+    dcc.Store(id="throughput-viewport"),
+    dcc.Store(id="throughput-zoom"),
+    dcc.Store(id="throughput-zoom-series"),
+
+    html.Div(id="throughput-message"),
+
     # KPI Section
-    html.Div(id="throughput-kpi-section", className="throughput-kpi-row"),
+    html.Div([
+        generate_kpi_card("Total Parcels IN", 0, "card-total", "throughput-total-in"),
+        generate_kpi_card("Total Parcels OUT", 0, "card-sorted", "throughput-total-out"),
+        generate_kpi_card("Overflow", 0, "card-overflow", "throughput-overflow"),
+        generate_kpi_card("Avg Parcels IN", 0, "card-throughput", "throughput-avg-in"),
+        generate_kpi_card("Avg Parcels OUT", 0, "card-throughput", "throughput-avg-out")
+    ], id="throughput-kpi-section", className="throughput-kpi-row", style=HIDE),
 
     # Charts Section
-    html.Div(id="throughput-chart-section", className="throughput-charts-row")
+    html.Div([
+        area_chart_graph("throughput-in-graph"),
+        area_chart_graph("throughput-out-graph")
+    ], id="throughput-chart-section", className="throughput-charts-row", style=HIDE)
 
 ], fluid=True)
@@ -1,6 +1,8 @@
 import datetime
 from dash import dcc, html
 import dash_bootstrap_components as dbc
+from config import ConfigData
+from components.loading import loading_indicator
 
 volume_layout = dbc.Container([
     html.H2("Parcel Statistics at Volume Scanner", className="volume-title mb-4"),
@@ -38,7 +40,7 @@ volume_layout = dbc.Container([
                 id="volume-graph-type",
                 options=[
                     {"label": "Histogram", "value": "hist"},
-                    {"label": "Normal Distribution", "value": "normal"}
+                    {"label": "Density (KDE)", "value": "kde"}
                 ],
                 value="hist",
                 clearable=False
@@ -47,13 +49,25 @@ volume_layout = dbc.Container([
         )
     ], className="mt-3", align="center"),
 
+    loading_indicator("volume-loading"),
+
     # Graphs output container
     html.Div(id='volume-graphs-output', className='mt-4'),
 
-    # Auto-refresh interval
+    # Joint distributions and box classes
+    html.H4("Joint Dimensions and Box Classes", className="mt-2 mb-3"),
+    loading_indicator("volume-joint-loading"),
+    html.Div(id='volume-joint-output'),
+
+    # What is rendered, for the auto-refresh patches
+    dcc.Store(id='volume-rendered'),
+    dcc.Store(id='volume-joint-rendered'),
+
+    # Auto-refresh interval, enabled while the selected window is live
     dcc.Interval(
         id='volume-interval',
-        interval=30 * 1000,  # 30 seconds
-        n_intervals=0
+        interval=ConfigData.VOLUME_REFRESH_INTERVAL_MS,
+        n_intervals=0,
+        disabled=True
     )
 ], fluid=True)
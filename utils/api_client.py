@@ -0,0 +1,102 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import ConfigData
+from utils.cache import TTLCache, make_key, window_is_live
+from utils.singleflight import SingleFlight, make_shared_flight
+
+# One pooled, keep-alive session shared by every page
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# In-process response cache shared by all callbacks of this worker
+response_cache = TTLCache(maxsize=ConfigData.BACKEND_CACHE_SIZE)
+
+# Concurrent identical queries wait on one outstanding request
+in_flight = SingleFlight()
+shared_flight = make_shared_flight(ConfigData.BACKEND_SHARED_CACHE_DIR)
+
+
+def _build_session():
+    """Creates a requests session with connection pooling and bounded retries."""
+    retry = Retry(
+        total=ConfigData.BACKEND_MAX_RETRIES,
+        connect=ConfigData.BACKEND_MAX_RETRIES,
+        read=ConfigData.BACKEND_MAX_RETRIES,
+        status=ConfigData.BACKEND_MAX_RETRIES,
+        backoff_factor=ConfigData.BACKEND_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        # Backend POSTs are read-only queries, so they are safe to retry
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=ConfigData.BACKEND_POOL_SIZE,
+        pool_maxsize=ConfigData.BACKEND_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Returns the shared backend session, creating it on first use.
+
+    Background callback jobs are forked processes; they get their own session
+    rather than sharing the parent's pooled sockets.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def backend_url(endpoint):
+    """Builds the full URL for a backend endpoint such as "summary"."""
+    return f"{ConfigData.BACKEND_URL.rstrip('/')}/{endpoint.strip('/')}"
+
+
+def post_json(endpoint, payload):
+    """POSTs payload to a backend endpoint and returns the decoded JSON body."""
+    timeout = ConfigData.BACKEND_TIMEOUTS.get(endpoint, ConfigData.BACKEND_DEFAULT_TIMEOUT)
+    response = get_session().post(backend_url(endpoint), json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def cached_post_json(endpoint, payload):
+    """Like post_json, but serves repeated identical queries from the response cache.
+
+    Concurrent misses for the same query are coalesced into one backend
+    request. Cached responses are shared between callers and must not be
+    mutated.
+    """
+    ttls = ConfigData.BACKEND_CACHE_TTLS.get(endpoint)
+    if ttls is None:
+        return post_json(endpoint, payload)
+
+    key = make_key(endpoint, payload)
+    data = response_cache.get(key)
+    if data is not None:
+        return data
+
+    historical_ttl, live_ttl = ttls
+    ttl = live_ttl if window_is_live(payload) else historical_ttl
+
+    def fetch():
+        if shared_flight is not None:
+            result = shared_flight.do(key, ttl, lambda: post_json(endpoint, payload))
+        else:
+            result = post_json(endpoint, payload)
+        response_cache.set(key, result, ttl)
+        return result
+
+    return in_flight.do(key, fetch)
@@ -0,0 +1,10 @@
+import diskcache
+from dash import DiskcacheManager
+from config import ConfigData
+
+# Slow backend callbacks run as background jobs in separate processes,
+# tracked through a local disk cache, so they don't hold Dash request
+# threads. When a callback re-fires while its previous job is still running,
+# Dash terminates the old job.
+background_cache = diskcache.Cache(ConfigData.BACKGROUND_CACHE_DIR)
+background_callback_manager = DiskcacheManager(background_cache)
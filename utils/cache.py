@@ -0,0 +1,107 @@
+import datetime
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_MIDNIGHT = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ]00:00(?::00(?:\.0+)?)?$")
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a per-entry TTL."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Returns hit/miss/eviction counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+def _normalize(value):
+    """Normalizes payload values so equivalent requests share a cache key."""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, str):
+        value = value.strip()
+        # Date pickers may send "2024-05-01T00:00:00" for "2024-05-01"
+        return _MIDNIGHT.sub(r"\1", value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def make_key(endpoint, payload):
+    """Builds a stable cache key from an endpoint and its JSON payload."""
+    return endpoint + ":" + json.dumps(_normalize(payload), sort_keys=True, separators=(",", ":"))
+
+
+def _parse_time(value, default):
+    try:
+        return datetime.datetime.strptime(str(value).strip()[:5], "%H:%M").time()
+    except (TypeError, ValueError):
+        return default
+
+
+def window_is_live(payload, now=None):
+    """True if the payload's date/time window has not ended yet."""
+    now = now or datetime.datetime.now()
+    try:
+        day = datetime.date.fromisoformat(str(payload.get("date"))[:10])
+    except (TypeError, ValueError):
+        return True
+    if day != now.date():
+        return day > now.date()
+    end = _parse_time(payload.get("end_time"), datetime.time(23, 59))
+    return datetime.datetime.combine(day, end) + datetime.timedelta(minutes=1) > now
@@ -0,0 +1,59 @@
+import os
+
+import diskcache
+
+from config import ConfigData
+
+# Per-session chat state shared by all workers on this host: the message
+# history, the in-progress answer being streamed, and cancellation requests.
+sessions = diskcache.Cache(os.path.join(ConfigData.BACKGROUND_CACHE_DIR, "chat-sessions"))
+
+
+def get_history(session_id):
+    """Stored messages for a session: {"entries": [...], "compacted": n}."""
+    return sessions.get(("history", session_id)) or {"entries": [], "compacted": 0}
+
+
+def append_history(session_id, *entries):
+    """Appends messages, dropping the oldest beyond CHATBOT_HISTORY_MAX_ENTRIES."""
+    key = ("history", session_id)
+    with sessions.transact():
+        history = sessions.get(key) or {"entries": [], "compacted": 0}
+        history["entries"].extend(entries)
+        overflow = len(history["entries"]) - ConfigData.CHATBOT_HISTORY_MAX_ENTRIES
+        if overflow > 0:
+            del history["entries"][:overflow]
+            history["compacted"] += overflow
+        sessions.set(key, history, expire=ConfigData.CHATBOT_HISTORY_TTL)
+
+
+def set_stream(session_id, **state):
+    """Publishes the state of the answer in progress (status, text, done, entries)."""
+    key = ("stream", session_id)
+    with sessions.transact():
+        current = sessions.get(key) or {"seq": 0}
+        current.update(state, seq=current["seq"] + 1)
+        sessions.set(key, current, expire=ConfigData.CHATBOT_HISTORY_TTL)
+
+
+def read_stream(session_id):
+    """Current stream state; a finished stream is removed so it is delivered once."""
+    key = ("stream", session_id)
+    with sessions.transact():
+        state = sessions.get(key)
+        if state is not None and state.get("done"):
+            sessions.delete(key)
+        return state
+
+
+def clear_stream(session_id):
+    sessions.delete(("stream", session_id))
+    sessions.delete(("cancel", session_id))
+
+
+def request_cancel(session_id):
+    sessions.set(("cancel", session_id), True, expire=ConfigData.CHATBOT_HISTORY_TTL)
+
+
+def cancel_requested(session_id):
+    return sessions.get(("cancel", session_id), False)
@@ -0,0 +1,217 @@
+import hashlib
+import marshal
+import os
+import pickle
+import re
+import sys
+import threading
+import uuid
+
+import diskcache
+import numpy as np
+
+from config import ConfigData
+
+# Words that don't change what a question asks for ("please show me the ...")
+_FILLER = {"a", "an", "the", "please", "can", "could", "you", "me", "tell", "show", "what", "is", "are"}
+_NON_WORD = re.compile(r"[^a-z0-9_<>=%.]+")
+
+
+def normalize_question(question):
+    """Lowercases, strips punctuation and filler words, collapses whitespace."""
+    words = _NON_WORD.sub(" ", question.lower()).split()
+    words = [w.strip(".") for w in words if w not in _FILLER]
+    return " ".join(w for w in words if w)
+
+
+def schema_hash():
+    """Fingerprint of the schema the prompts are built from."""
+    text = "\0".join([
+        ConfigData.CHATBOT_DATA_REPRESENTATION,
+        ConfigData.TABLE_SCHEMA,
+        ConfigData.DATAFRAME_SCHEMA,
+        ConfigData.SCHEMA_DESCRIPTION,
+    ])
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def result_digest(result):
+    """Stable hash of an execution result, for keying cached summaries."""
+    try:
+        payload = pickle.dumps(result, protocol=4)
+    except Exception:
+        payload = repr(result).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def compile_code(code):
+    return compile(code, "<chatbot>", "exec")
+
+
+class ChatCache:
+    """Persistent cache of generated code (with its bytecode) and summaries.
+
+    Entries live in a diskcache shared by all workers on this host, keyed on
+    the normalized question and the schema fingerprint; when the schema in
+    ConfigData changes, the cache is cleared on open. Optionally, a question
+    that misses exactly is matched against earlier ones by cosine similarity
+    of their embeddings.
+
+    Embeddings are kept apart from the LRU entries: a ring of max_similar
+    float32 rows, one key per slot, plus a (epoch, count) state key. Each
+    worker holds the normalized matrix in memory and reads only the rows
+    written since its last lookup.
+    """
+
+    def __init__(self, directory, size_limit, ttl, threshold, max_similar):
+        self.cache = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.vectors = diskcache.Cache(os.path.join(directory, "embeddings"), eviction_policy="none")
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_similar = max_similar
+        self.schema = schema_hash()
+        # The schema marker lives with the embeddings, which are never evicted;
+        # in the LRU cache it could be evicted and the next worker would clear all
+        if self.vectors.get("schema") != self.schema:
+            self.clear()
+        self._lock = threading.Lock()
+        self._matrix_lock = threading.Lock()
+        self._matrix = None       # unit-length rows, one per ring slot
+        self._names = []          # normalized question per slot
+        self._synced = (None, 0)  # (epoch, count) the matrix reflects
+        self.code_hits = 0
+        self.similar_hits = 0
+        self.code_misses = 0
+        self.summary_hits = 0
+        self.summary_misses = 0
+
+    def _code_key(self, normalized):
+        return ("code", self.schema, normalized)
+
+    def _load(self, normalized):
+        entry = self.cache.get(self._code_key(normalized))
+        if entry is None:
+            return None
+        # Bytecode is only reusable by the interpreter version that made it
+        if entry.get("cache_tag") == sys.implementation.cache_tag:
+            compiled = marshal.loads(entry["bytecode"])
+        else:
+            compiled = compile_code(entry["code"])
+        return entry["code"], compiled
+
+    def _sync_vectors(self):
+        """Reads embedding rows written since the last call; returns (matrix, names) of filled slots."""
+        epoch, count = self.vectors.get(("state", self.schema)) or (None, 0)
+        with self._matrix_lock:
+            synced_epoch, synced = self._synced
+            if epoch != synced_epoch or count < synced:
+                self._matrix, self._names, synced = None, [None] * self.max_similar, 0
+            for n in range(max(synced, count - self.max_similar), count):
+                row = self.vectors.get(("vector", self.schema, n % self.max_similar))
+                if row is None:
+                    continue
+                name, data = row
+                vector = np.frombuffer(data, dtype=np.float32)
+                if self._matrix is None or self._matrix.shape[1] != len(vector):
+                    self._matrix = np.zeros((self.max_similar, len(vector)), dtype=np.float32)
+                    self._names = [None] * self.max_similar
+                self._matrix[n % self.max_similar] = vector / (np.linalg.norm(vector) + 1e-12)
+                self._names[n % self.max_similar] = name
+            self._synced = (epoch, count)
+            if self._matrix is None:
+                return None, []
+            filled = min(count, self.max_similar)
+            return self._matrix[:filled], self._names[:filled]
+
+    def _most_similar(self, embedding):
+        matrix, names = self._sync_vectors()
+        query = np.asarray(embedding, dtype=np.float32)
+        if matrix is None or not len(names) or matrix.shape[1] != len(query):
+            return None
+        scores = matrix @ query / (np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        if names[best] is None or scores[best] < self.threshold:
+            return None
+        return self._load(names[best])
+
+    def lookup_code(self, question, embed=None):
+        """Returns ((code, compiled) or None, embedding).
+
+        Tries the normalized question first; on a miss, and if embed is given,
+        embeds the question and looks for the most similar earlier question
+        above the threshold. The embedding is returned so set_code can store
+        it without a second embedding call.
+        """
+        normalized = normalize_question(question)
+        hit = self._load(normalized)
+        embedding = None
+        similar = False
+        if hit is None and embed is not None:
+            embedding = embed(normalized)
+            hit = self._most_similar(embedding)
+            similar = hit is not None
+        with self._lock:
+            if hit is None:
+                self.code_misses += 1
+            elif similar:
+                self.similar_hits += 1
+            else:
+                self.code_hits += 1
+        return hit, embedding
+
+    def set_code(self, question, code, compiled, embedding=None):
+        normalized = normalize_question(question)
+        self.cache.set(self._code_key(normalized), {
+            "code": code,
+            "bytecode": marshal.dumps(compiled),
+            "cache_tag": sys.implementation.cache_tag,
+        }, expire=self.ttl)
+        if embedding is None:
+            return
+        # Append to the ring: one row and the state key, nothing rewritten
+        data = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self.vectors.transact():
+            epoch, count = self.vectors.get(("state", self.schema)) or (uuid.uuid4().hex, 0)
+            self.vectors.set(("vector", self.schema, count % self.max_similar), (normalized, data))
+            self.vectors.set(("state", self.schema), (epoch, count + 1))
+
+    def _summary_key(self, question, result):
+        return ("summary", self.schema, normalize_question(question), result_digest(result))
+
+    def get_summary(self, question, result):
+        summary = self.cache.get(self._summary_key(question, result))
+        with self._lock:
+            if summary is None:
+                self.summary_misses += 1
+            else:
+                self.summary_hits += 1
+        return summary
+
+    def set_summary(self, question, result, summary):
+        self.cache.set(self._summary_key(question, result), summary, expire=self.ttl)
+
+    def clear(self):
+        self.cache.clear()
+        self.vectors.clear()
+        self.vectors.set("schema", self.schema)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "code_hits": self.code_hits,
+                "similar_hits": self.similar_hits,
+                "code_misses": self.code_misses,
+                "summary_hits": self.summary_hits,
+                "summary_misses": self.summary_misses,
+                "entries": len(self.cache),
+                "size_bytes": self.cache.volume(),
+            }
+
+
+chat_cache = ChatCache(
+    ConfigData.CHATBOT_CACHE_DIR,
+    size_limit=ConfigData.CHATBOT_CACHE_SIZE_LIMIT,
+    ttl=ConfigData.CHATBOT_CACHE_TTL,
+    threshold=ConfigData.CHATBOT_SIMILARITY_THRESHOLD,
+    max_similar=ConfigData.CHATBOT_SIMILARITY_MAX_ENTRIES,
+)
@@ -0,0 +1,131 @@
+# Chatbot engine: LLM client, prompts and chains.
+# Importing this module is expensive (LangChain, Azure OpenAI client), so
+# layouts/chatbot.py imports it on first use rather than at app startup.
+import os
+from dotenv import load_dotenv
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from langchain.prompts import PromptTemplate
+from config import ConfigData
+
+# === Load environment variables ===
+load_dotenv()
+
+# === Initialize LLM ===
+llm = AzureChatOpenAI(
+    openai_api_key=os.getenv("OPENAI_API_KEY"),
+    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+    deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+    openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+)
+
+# === Optional embeddings for similar-question cache hits ===
+embeddings = None
+if os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"):
+    embeddings = AzureOpenAIEmbeddings(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
+        openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+    )
+
+# === Prompts ===
+schema_description = ConfigData.SCHEMA_DESCRIPTION
+
+records_code_prompt = PromptTemplate(
+    template="""
+You are an expert Python developer working with structured JSON data.
+
+The data is loaded in a Python list of dictionaries stored in a variable called `data`.
+
+Your task:
+- Read the user question.
+- Identify the relevant fields from the schema.
+- Write a **pure Python code snippet** that stores the answer in a variable named `result` and then prints it using `print(result)`.
+
+⚠️ Constraints:
+- Do NOT return any markdown (like ```python).
+- Do NOT include comments or extra text.
+- Your output must be **only Python code** using `result = ...` followed by `print(result)`
+
+Table Schema:
+{table_schema}
+
+Schema Description:
+{schema_description}
+
+User Question: {user_question}
+""",
+    input_variables=["user_question"],
+)
+
+dataframe_code_prompt = PromptTemplate(
+    template="""
+You are an expert Python developer working with pandas.
+
+The parcel data is loaded in two pandas DataFrames:
+- `df`: one row per parcel, with nested fields flattened into columns.
+- `events`: one row per parcel event; `events["parcel"]` is the row label of the parcel in `df`.
+`pd` (pandas) and `np` (numpy) are already imported.
+
+Your task:
+- Read the user question.
+- Identify the relevant columns from the schema.
+- Write a Python code snippet using vectorized pandas operations (no Python loops over rows) that stores the answer in a variable named `result` and then prints it using `print(result)`.
+- Missing values are <NA>; boolean and integer columns are nullable.
+
+⚠️ Constraints:
+- Do NOT return any markdown (like ```python).
+- Do NOT include comments or extra text.
+- Your output must be **only Python code** using `result = ...` followed by `print(result)`
+
+DataFrame Schema:
+{table_schema}
+
+Schema Description:
+{schema_description}
+
+User Question: {user_question}
+""",
+    input_variables=["user_question"],
+)
+
+if ConfigData.CHATBOT_DATA_REPRESENTATION == "records":
+    code_prompt, table_schema = records_code_prompt, ConfigData.TABLE_SCHEMA
+else:
+    code_prompt, table_schema = dataframe_code_prompt, ConfigData.DATAFRAME_SCHEMA
+
+summary_prompt = PromptTemplate(
+    template="""
+You are a helpful assistant that summarizes code results in natural language.
+
+Given:
+- The user's original question
+- The Python code that was generated and executed
+- The value of the variable `result` after execution
+
+You can refer following the following mapping to number to its meaning and when the filds are valid and values. you can consider only fileds that are metioned in genarted code or result to mapping 
+mapping:
+{schema_description}
+Your task:
+- Return a clear, helpful natural language answer to the user's question based on the result.
+- Keep it simple structured and non-technical.
+
+User Question:
+{user_question}
+
+Generated Code:
+{code}
+
+Execution Result (stored in variable `result`):
+{result}
+""",
+    input_variables=["user_question", "code", "result", "schema_description"],
+)
+
+# === Bind chains ===
+code_chain = code_prompt.partial(
+    table_schema=table_schema,
+    schema_description=schema_description,
+) | llm
+
+summary_chain = summary_prompt | llm
@@ -0,0 +1,223 @@
+import os
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from utils.chatbot_cache import normalize_question
+from utils.parcel_store import get_parcel_store
+
+# Rule-based answers for the common count/rate questions, computed from the
+# columnar parcel store instead of going through the LLM. A question is only
+# answered here when every word in it is understood; anything else (dates,
+# locations, "and"/"or", ...) falls through to the LLM.
+
+EXIT_STATES = {"1": "lost", "2": "end of tracking", "3": "handover"}
+GROUP_COLUMNS = {"status": "status", "exit_state": "exit state", "actual_destination": "actual destination"}
+
+# Phrases rewritten into slot tokens; earlier alternatives win (longer phrases first)
+_PHRASES = [
+    (r"\bsorted[ _]off[ _]end\b", "status=sorted_off_end"),
+    (r"\bunsorted\b", "status=unsorted"),
+    (r"\bsorted\b", "status=sorted"),
+    (r"\bopen\b", "status=open"),
+    (r"\bend[ _]of[ _]tracking\b", "exit_state=2"),
+    (r"\bhand(?:ed)?[ _]?over\b", "exit_state=3"),
+    (r"\blost\b", "exit_state=1"),
+    (r"\bexit[ _](?:state|reason)s?\b", "by=exit_state"),
+    (r"\b(?:actual[ _])?destinations?\b", "by=actual_destination"),
+    (r"\bstatus(?:es)?\b", "by=status"),
+    (r"\bbarcode[ _]errors?\b", "flag=barcode_error"),
+    (r"\bvolume[ _]errors?\b", "flag=volume_error"),
+    (r"\btop (\d+)\b", "top={}"),
+]
+_PHRASE_PATTERN = re.compile("|".join(f"(?P<p{i}>{pattern})" for i, (pattern, _) in enumerate(_PHRASES)))
+
+
+def _slot_token(match):
+    for i, (_, token) in enumerate(_PHRASES):
+        if match.group(f"p{i}") is not None:
+            return token.format(*(g for g in match.groups() if g is not None and g.isdigit()))
+
+
+_RATE_WORDS = {"rate", "rates", "percentage", "percent", "%", "ratio", "share", "fraction", "proportion"}
+_IGNORED_WORDS = {
+    "how", "many", "number", "of", "count", "counts", "total", "parcels", "parcel", "items", "item",
+    "were", "was", "with", "have", "has", "had", "did", "do", "does", "get", "got", "gets", "been",
+    "in", "per", "by", "each", "for", "breakdown", "distribution", "group", "grouped", "sort",
+    "order", "ordered", "list", "there", "all", "which", "most", "as", "marked", "having",
+}
+
+Intent = namedtuple("Intent", "filters group_by metric top")
+
+
+def parse_intent(question):
+    """Parses a question into an Intent, or returns None if it isn't fully understood."""
+    text = normalize_question(question)
+    text = _PHRASE_PATTERN.sub(_slot_token, text)
+
+    filters, group_by, metric, top = {}, None, "count", None
+    for word in text.split():
+        slot, has_value, value = word.partition("=")
+        if not has_value:
+            if word in _RATE_WORDS:
+                metric = "rate"
+            elif word not in _IGNORED_WORDS:
+                return None
+        elif slot in ("status", "exit_state", "flag"):
+            key = value if slot == "flag" else slot
+            if key in filters:  # two values for one field: ambiguous
+                return None
+            filters[key] = value
+        elif slot == "by":
+            if group_by not in (None, value):
+                return None
+            group_by = value
+        else:
+            top = int(value)
+
+    if group_by in filters or (metric == "rate" and not filters and group_by is None):
+        return None
+    if top is not None and group_by is None:
+        return None
+    return Intent(tuple(sorted(filters.items())), group_by, metric, top)
+
+
+def _matching_codes(categories, value):
+    labels = {value}
+    if value in EXIT_STATES:
+        labels.add(EXIT_STATES[value])
+        labels.add(f"{value}.0")
+    return [i for i, category in enumerate(categories) if category.lower() in labels]
+
+
+def _mask(store, filters):
+    mask = np.ones(len(store), dtype=bool)
+    for name, value in filters:
+        if name in ("barcode_error", "volume_error"):
+            mask &= np.asarray(store.column(name)) == 1
+        else:
+            codes, categories = store.categorical(name)
+            mask &= np.isin(codes, _matching_codes(categories, value))
+    return mask
+
+
+def _group_label(name, category):
+    if category is None:
+        return "(none)"
+    return EXIT_STATES.get(category, category) if name == "exit_state" else category
+
+
+def evaluate(store, intent):
+    """Computes the intent's result from the store: a number, or {label: value} for groups."""
+    mask = _mask(store, intent.filters)
+    total = len(store)
+    if intent.group_by is None:
+        count = int(mask.sum())
+        if intent.metric == "rate":
+            return round(100.0 * count / total, 2) if total else 0.0
+        return count
+
+    codes, categories = store.categorical(intent.group_by)
+    codes = np.asarray(codes)
+    # Code -1 (missing) is counted in the last bin
+    selected = np.bincount(np.where(codes[mask] < 0, len(categories), codes[mask]), minlength=len(categories) + 1)
+    if intent.metric == "rate":
+        totals = np.bincount(np.where(codes < 0, len(categories), codes), minlength=len(categories) + 1)
+        values = np.divide(100.0 * selected, totals, out=np.zeros(len(totals)), where=totals > 0)
+        order = np.argsort(-values, kind="stable")
+        order = order[totals[order] > 0]
+    else:
+        values = selected
+        order = np.argsort(-values, kind="stable")
+        order = order[values[order] > 0]
+    if intent.top is not None:
+        order = order[:intent.top]
+
+    labels = list(categories) + [None]
+    return {
+        _group_label(intent.group_by, labels[i]): (round(float(values[i]), 2) if intent.metric == "rate" else int(values[i]))
+        for i in order
+    }
+
+
+def _describe_filters(filters):
+    parts = []
+    for name, value in filters:
+        if name == "exit_state":
+            parts.append(f"exit state **{EXIT_STATES.get(value, value)}**")
+        elif name == "status":
+            parts.append(f"status **{value}**")
+        else:
+            parts.append(f"**{name.replace('_', ' ')}**")
+    return " and ".join(parts)
+
+
+def format_answer(intent, result):
+    """Markdown answer for an evaluated intent."""
+    subject = _describe_filters(intent.filters)
+    if intent.group_by is None:
+        if intent.metric == "rate":
+            return f"**{result}%** of parcels have {subject}."
+        return f"**{result:,}** parcels" + (f" have {subject}." if subject else " in total.")
+
+    unit = "%" if intent.metric == "rate" else "parcels"
+    header = f"Parcels by {GROUP_COLUMNS[intent.group_by]}" + (f" with {subject}" if subject else "") + ":"
+    if not result:
+        return header + "\n\nNo matching parcels."
+    rows = "\n".join(f"| {label} | {value:,} |" for label, value in result.items())
+    return f"{header}\n\n| {GROUP_COLUMNS[intent.group_by]} | {unit} |\n|---|---|\n{rows}"
+
+
+_results = {}
+_results_lock = threading.Lock()
+
+
+def answer(question):
+    """Answers a question from parcel aggregates; returns (intent, result, markdown) or None.
+
+    Results are memoized per store version, so repeated questions are dictionary lookups.
+    """
+    intent = parse_intent(question)
+    if intent is None:
+        return None
+    store = get_parcel_store()
+    version = (store.meta["size"], store.meta["mtime_ns"])
+    with _results_lock:
+        if _results.get("version") != version:
+            _results.clear()
+            _results["version"] = version
+        result = _results.get(intent)
+    if result is None:
+        result = evaluate(store, intent)
+        with _results_lock:
+            if _results.get("version") == version:
+                _results[intent] = result
+    return intent, result, format_answer(intent, result)
+
+
+# Aggregates computed when the chatbot warms up, before the first question
+COMMON_QUESTIONS = [
+    "how many parcels",
+    "parcels by status",
+    "parcels by exit state",
+    "parcels by actual destination",
+    "barcode error rate",
+    "volume error rate",
+]
+
+
+def warm_aggregates():
+    for question in COMMON_QUESTIONS:
+        answer(question)
+
+
+def _reset_after_fork():
+    global _results_lock
+    if _results_lock.locked():
+        _results.clear()
+    _results_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,260 @@
+import asyncio
+import importlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ConfigData
+from utils.parcel_data import get_parcel_source
+from utils.chatbot_cache import chat_cache, compile_code
+from utils.chatbot_sandbox import get_sandbox
+from utils.chat_sessions import sessions, append_history, set_stream, cancel_requested
+
+# How often a streamed summary is published and checked for cancellation
+PUBLISH_SECONDS = 0.1
+CANCEL_CHECK_SECONDS = 0.5
+
+# === Lazy engine initialization ===
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_chat_engine():
+    """Imports the LLM chains (or the stub, CHATBOT_LLM=stub) and loads the parcel records on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if ConfigData.CHATBOT_LLM == "stub":
+                engine = importlib.import_module("utils.chatbot_stub").load_stub_engine()
+            else:
+                engine = importlib.import_module("utils.chatbot_engine")
+            get_parcel_source()
+            _engine = engine
+    return _engine
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, saving up at most `capacity`.
+
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, tokens=1):
+        self._refill()
+        return not self._lock.locked() and self.tokens >= tokens
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def _content(message):
+    return message.content if hasattr(message, "content") else message.get("text", "")
+
+
+class ChatPipeline:
+    """Answers chat questions on an asyncio event loop in a background thread.
+
+    At most max_concurrent questions are answered at once; the rest wait in
+    arrival order and see their queue position. Every LLM request first takes
+    a token from a shared bucket refilled at requests_per_minute. Progress and
+    the streamed summary are published through utils.chat_sessions; those
+    disk writes, like all blocking calls, run on the executor so the loop
+    only schedules.
+    """
+
+    def __init__(self, max_concurrent, requests_per_minute, burst):
+        self.max_concurrent = max_concurrent
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        # Sandbox runs, cache lookups and embeddings are blocking calls
+        self._executor = ThreadPoolExecutor(max_concurrent + 2, thread_name_prefix="chatbot-pipeline")
+        self._waiting = []
+        self._positions_dirty = False
+        self._positions_task = None
+        self.active = 0
+        self.completed = 0
+        threading.Thread(target=self._loop.run_forever, name="chatbot-pipeline-loop", daemon=True).start()
+
+    def submit(self, session_id, question, started):
+        """Queues a question; returns a concurrent.futures.Future of the bot entry."""
+        return asyncio.run_coroutine_threadsafe(self._answer(session_id, question, started), self._loop)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": len(self._waiting),
+            "completed": self.completed,
+            "max_concurrent": self.max_concurrent,
+        }
+
+    @staticmethod
+    def _write_positions(waiting):
+        with sessions.transact():
+            for position, session_id in enumerate(waiting, start=1):
+                set_stream(session_id, status=f"In queue, position {position}...")
+
+    def _publish_positions(self):
+        """Schedules a write of the queue positions; changes made meanwhile share the next write."""
+        self._positions_dirty = True
+        if self._positions_task is None:
+            self._positions_task = self._loop.create_task(self._flush_positions())
+
+    async def _flush_positions(self):
+        try:
+            while self._positions_dirty:
+                self._positions_dirty = False
+                await self._blocking(self._write_positions, list(self._waiting))
+        finally:
+            self._positions_task = None
+
+    async def _blocking(self, fn, *args, **kwargs):
+        return await self._loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def _publish(self, session_id, **state):
+        await self._blocking(set_stream, session_id, **state)
+
+    async def _llm_request(self, session_id):
+        if not self._bucket.available():
+            await self._publish(session_id, status="Waiting for LLM capacity...")
+        await self._bucket.acquire()
+
+    async def _answer(self, session_id, question, started):
+        self._waiting.append(session_id)
+        self._publish_positions()
+        async with self._semaphore:
+            self._waiting.remove(session_id)
+            self._publish_positions()
+            # A position write still in flight must not land after this answer's status
+            await asyncio.shield(self._positions_task)
+            self.active += 1
+            try:
+                if await self._blocking(cancel_requested, session_id):
+                    entry = {"role": "bot", "text": "⏹ Stopped.", "path": "🤖 LLM"}
+                else:
+                    entry = await self._llm_answer(session_id, question, started)
+            except Exception as e:
+                entry = {"role": "bot", "text": f"❌ Error: {e}", "path": "🤖 LLM"}
+            finally:
+                self.active -= 1
+                self.completed += 1
+        await self._blocking(append_history, session_id, entry)
+        await self._publish(session_id, done=True, entry=entry)
+        return entry
+
+    async def _llm_answer(self, session_id, question, started):
+        await self._publish(session_id, status="Generating code...", text="")
+        engine = await self._blocking(get_chat_engine)
+
+        # Step 1: Generate Python code, unless this question was answered before
+        embed = engine.embeddings.embed_query if engine.embeddings is not None else None
+        cached, embedding = await self._blocking(chat_cache.lookup_code, question, embed)
+        if cached:
+            code, compiled = cached
+        else:
+            await self._llm_request(session_id)
+            await self._publish(session_id, status="Generating code...")
+            code = _content(await engine.code_chain.ainvoke({"user_question": question}))
+            code = re.sub(r"```(?:python)?", "", code).strip("` \n")
+            compiled = None
+
+            print("\n🔧 Generated Code from LLM:\n", code)
+
+        # Step 2: Execute code in the sandbox pool
+        await self._publish(session_id, status="Running code...")
+        try:
+            if compiled is None:
+                compiled = compile_code(code)
+            result = await self._blocking(
+                get_sandbox().run, compiled, ConfigData.CHATBOT_SANDBOX_TIMEOUT,
+                job_id=session_id, should_cancel=lambda: cancel_requested(session_id),
+            )
+        except Exception as e:
+            return {"role": "bot", "text": f"❌ Error executing code: {e}", "path": "🤖 LLM"}
+        if not cached:
+            await self._blocking(chat_cache.set_code, question, code, compiled, embedding)
+
+        # Step 3: Generate summary (cached per question and result), streamed as it is written
+        summary = await self._blocking(chat_cache.get_summary, question, result)
+        if summary is None:
+            await self._llm_request(session_id)
+            await self._publish(session_id, status="Summarizing...")
+            parts = []
+            published = checked = time.monotonic()
+            async for chunk in engine.summary_chain.astream({
+                "user_question": question,
+                "code": code,
+                "result": result,
+                "schema_description": engine.schema_description
+            }):
+                parts.append(_content(chunk))
+                if time.monotonic() - checked >= CANCEL_CHECK_SECONDS:
+                    checked = time.monotonic()
+                    if await self._blocking(cancel_requested, session_id):
+                        parts.append(" …(stopped)")
+                        break
+                if time.monotonic() - published >= PUBLISH_SECONDS:
+                    await self._publish(session_id, text=f"💬 Summary:\n\n{''.join(parts)}")
+                    published = time.monotonic()
+            else:
+                await self._blocking(chat_cache.set_summary, question, result, "".join(parts))
+            summary = "".join(parts)
+
+        path = "🤖 LLM, cached code" if cached else "🤖 LLM"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return {
+            "role": "bot",
+            "text": f"💬 Summary:\n\n{summary}",
+            "path": f"{path}, answered in {elapsed_ms:.0f} ms",
+            "elapsed_ms": elapsed_ms,
+        }
+
+
+_pipeline = None
+_pipeline_pid = None
+_pipeline_lock = threading.Lock()
+
+
+def get_chat_pipeline():
+    """Returns this process's chat pipeline, starting its event loop on first use."""
+    global _pipeline, _pipeline_pid
+    with _pipeline_lock:
+        if _pipeline is None or _pipeline_pid != os.getpid():
+            _pipeline = ChatPipeline(
+                ConfigData.CHATBOT_MAX_CONCURRENT,
+                requests_per_minute=ConfigData.CHATBOT_LLM_REQUESTS_PER_MINUTE,
+                burst=ConfigData.CHATBOT_LLM_BURST,
+            )
+            _pipeline_pid = os.getpid()
+        return _pipeline
+
+
+def _reset_after_fork():
+    # Background jobs forked during the chatbot warm-up must not inherit
+    # these locks held; the pipeline itself is already per process
+    global _engine_lock, _pipeline_lock
+    _engine_lock = threading.Lock()
+    _pipeline_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
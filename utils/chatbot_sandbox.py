@@ -0,0 +1,237 @@
+import marshal
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+
+import psutil
+
+from config import ConfigData
+from utils.parcel_data import get_parcel_source
+from utils.parcel_frames import get_parcel_frames
+
+try:
+    import resource
+except ImportError:  # Windows: worker memory isn't capped
+    resource = None
+
+
+# Module the forkserver imports to load the parcel data before forking workers
+_PRELOAD = "utils.chatbot_sandbox_preload"
+
+
+class SandboxError(Exception):
+    """Generated code failed, exceeded its limits or was cancelled."""
+
+
+def _apply_memory_limit(limit_mb):
+    # Cap the address space at what the worker uses now (interpreter plus
+    # loaded parcel data) plus the allowed headroom.
+    if resource is None or limit_mb <= 0:
+        return
+    limit = psutil.Process().memory_info().vms + limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _compact_result(result, max_bytes):
+    payload = pickle.dumps(("ok", result), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(payload) <= max_bytes:
+        return payload
+    text = repr(result)[:max_bytes // 4] + " ... (truncated)"
+    return pickle.dumps(("ok", text), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _namespace(source):
+    """Variables generated code can use, per ConfigData.CHATBOT_DATA_REPRESENTATION."""
+    if ConfigData.CHATBOT_DATA_REPRESENTATION == "records":
+        source.refresh()
+        return {"data": source.records}
+    import numpy as np
+    import pandas as pd
+    if int(pd.__version__.split(".")[0]) < 3:
+        # Default (and the only mode) from pandas 3
+        pd.set_option("mode.copy_on_write", True)
+    df, events = get_parcel_frames()
+    # Per-job shallow copies: with copy-on-write, generated code that adds
+    # columns or modifies in place (inplace=True, .loc[...] = ...) copies the
+    # data it touches instead of changing the frames cached for later jobs
+    return {"df": df.copy(deep=False), "events": events.copy(deep=False), "pd": pd, "np": np}
+
+
+def _worker_main(conn, memory_limit_mb, max_result_bytes):
+    """Worker loop: receives marshalled code objects, replies with pickled results."""
+    # Normally already loaded by the forkserver (see _PRELOAD) and shared
+    # copy-on-write; loaded here otherwise, before the address space is capped
+    source = get_parcel_source()
+    _namespace(source)
+    _apply_memory_limit(memory_limit_mb)
+    conn.send_bytes(b"ready")
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            return
+        local_vars = _namespace(source)
+        try:
+            # One namespace as globals, so lambdas and comprehensions see df/data
+            exec(marshal.loads(message), local_vars)
+            reply = _compact_result(local_vars.get("result"), max_result_bytes)
+        except MemoryError:
+            reply = pickle.dumps(("error", "memory limit exceeded"))
+        except BaseException as e:
+            reply = pickle.dumps(("error", f"{type(e).__name__}: {e}"))
+        del local_vars
+        conn.send_bytes(reply)
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb, max_result_bytes):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_mb, max_result_bytes),
+            name="chatbot-sandbox",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.cancelled = False
+
+    def wait_ready(self, timeout):
+        """True once the worker has loaded its data; False if it is still starting."""
+        if not self.ready and self.conn.poll(timeout):
+            self.conn.recv_bytes()
+            self.ready = True
+        return self.ready
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """Pool of pre-started processes that run generated code with limits.
+
+    Workers are started from a forkserver (spawn where there is none) rather
+    than forked from this multi-threaded process, where a child could inherit
+    a lock held by another thread and hang. The forkserver loads the parcel
+    data once, so the workers forked from it share those pages copy-on-write
+    and start in milliseconds. Waiting for a worker to start is bounded by
+    startup_timeout, separately from the job timeout, and a worker is never
+    killed for being slow to start. A job that runs past its timeout, or is
+    cancelled, has its worker killed and replaced.
+    """
+
+    def __init__(self, size, memory_limit_mb, max_result_bytes, startup_timeout):
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            # Imported once by the single-threaded server, before it forks workers
+            self._context.set_forkserver_preload(["numpy", "pandas", __name__, _PRELOAD])
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self._startup_timeout = startup_timeout
+        self._memory_limit_mb = memory_limit_mb
+        self._max_result_bytes = max_result_bytes
+        self._idle = queue.Queue()
+        self._running = {}
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return _Worker(self._context, self._memory_limit_mb, self._max_result_bytes)
+
+    def _wait(self, worker, timeout, should_cancel):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if worker.conn.poll(min(remaining, 0.25) if should_cancel else remaining):
+                return True
+            if should_cancel is not None and should_cancel():
+                worker.cancelled = True
+                raise SandboxError("cancelled")
+
+    def run(self, compiled, timeout, job_id=None, should_cancel=None):
+        """Runs a code object and returns its `result` variable; raises SandboxError.
+
+        should_cancel, if given, is polled while the job runs (for cancellation
+        requested from another process).
+        """
+        worker = self._idle.get()
+        with self._lock:
+            if job_id is not None:
+                self._running[job_id] = worker
+        healthy = False
+        try:
+            if not worker.wait_ready(self._startup_timeout):
+                healthy = True  # still loading: keep it for the next job
+                raise SandboxError("sandbox is still loading the parcel data, try again shortly")
+            worker.conn.send_bytes(marshal.dumps(compiled))
+            if not self._wait(worker, timeout, should_cancel):
+                raise SandboxError(f"timed out after {timeout:g} s")
+            status, value = pickle.loads(worker.conn.recv_bytes())
+            healthy = True
+        except (EOFError, OSError):
+            if worker.cancelled:
+                raise SandboxError("cancelled")
+            raise SandboxError("worker exited (memory limit exceeded?)")
+        finally:
+            with self._lock:
+                if job_id is not None and self._running.get(job_id) is worker:
+                    del self._running[job_id]
+            if healthy:
+                self._idle.put(worker)
+            else:
+                worker.kill()
+                self._idle.put(self._spawn())
+
+        if status == "error":
+            raise SandboxError(value)
+        return value
+
+    def cancel(self, job_id):
+        """Kills the worker running job_id, if any; returns True if a job was cancelled."""
+        with self._lock:
+            worker = self._running.pop(job_id, None)
+        if worker is None:
+            return False
+        worker.cancelled = True
+        worker.process.kill()
+        return True
+
+
+_sandbox = None
+_sandbox_pid = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox():
+    """Returns this process's sandbox pool, starting it on first use.
+
+    Pools aren't shared across fork: a forked process starts its own.
+    """
+    global _sandbox, _sandbox_pid
+    with _sandbox_lock:
+        if _sandbox is None or _sandbox_pid != os.getpid():
+            _sandbox = SandboxPool(
+                ConfigData.CHATBOT_SANDBOX_WORKERS,
+                memory_limit_mb=ConfigData.CHATBOT_SANDBOX_MEMORY_MB,
+                max_result_bytes=ConfigData.CHATBOT_SANDBOX_MAX_RESULT_BYTES,
+                startup_timeout=ConfigData.CHATBOT_SANDBOX_STARTUP_TIMEOUT,
+            )
+            _sandbox_pid = os.getpid()
+        return _sandbox
+
+
+def _reset_after_fork():
+    global _sandbox_lock
+    _sandbox_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,10 @@
+from utils.chatbot_sandbox import _namespace
+from utils.parcel_data import get_parcel_source
+
+# Imported by the sandbox forkserver (see SandboxPool) so the parcel data is
+# loaded once there and shared copy-on-write by every worker forked from it.
+# A failure is left for the workers to hit and report.
+try:
+    _namespace(get_parcel_source())
+except Exception:
+    pass
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+
+from config import ConfigData
+
+# Stand-in for utils.chatbot_engine (CHATBOT_LLM=stub): replays canned
+# responses with a configurable latency, for load tests and offline work.
+#
+# CHATBOT_STUB_RESPONSES may point to a JSON file:
+#   {"code": {"<question>": "<python code>", ...},
+#    "default_code": "<python code>",
+#    "summary": "<template, may use {user_question} and {result}>"}
+
+DEFAULT_CODE = {
+    "dataframe": "result = int(len(df))",
+    "records": "result = len(data)",
+}
+DEFAULT_SUMMARY = "There are {result} matching parcels for your question: {user_question}"
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubChain:
+    """Runnable-like chain: invoke/ainvoke return a message, stream/astream yield word chunks.
+
+    latency is the time to the first token; token_delay the time between tokens.
+    """
+
+    def __init__(self, respond, latency, token_delay):
+        self.respond = respond
+        self.latency = latency
+        self.token_delay = token_delay
+
+    def _chunks(self, inputs):
+        words = self.respond(inputs).split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def invoke(self, inputs):
+        time.sleep(self.latency + self.token_delay * len(self._chunks(inputs)))
+        return _Message(self.respond(inputs))
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.latency + self.token_delay * len(self._chunks(inputs)))
+        return _Message(self.respond(inputs))
+
+    def stream(self, inputs):
+        time.sleep(self.latency)
+        for chunk in self._chunks(inputs):
+            time.sleep(self.token_delay)
+            yield _Message(chunk)
+
+    async def astream(self, inputs):
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(inputs):
+            await asyncio.sleep(self.token_delay)
+            yield _Message(chunk)
+
+
+class StubEngine:
+    """Same attributes as utils.chatbot_engine, backed by StubChain."""
+
+    def __init__(self, responses=None, latency=None, token_delay=None):
+        responses = responses or {}
+        latency = ConfigData.CHATBOT_STUB_LATENCY if latency is None else latency
+        token_delay = ConfigData.CHATBOT_STUB_TOKEN_DELAY if token_delay is None else token_delay
+        code = responses.get("code", {})
+        default_code = responses.get("default_code", DEFAULT_CODE[ConfigData.CHATBOT_DATA_REPRESENTATION])
+        summary = responses.get("summary", DEFAULT_SUMMARY)
+
+        self.code_chain = StubChain(lambda i: code.get(i["user_question"], default_code), latency, token_delay)
+        self.summary_chain = StubChain(lambda i: summary.format(**i), latency, token_delay)
+        self.embeddings = None
+        self.schema_description = ConfigData.SCHEMA_DESCRIPTION
+
+
+def load_stub_engine():
+    responses = None
+    if ConfigData.CHATBOT_STUB_RESPONSES:
+        with open(ConfigData.CHATBOT_STUB_RESPONSES) as f:
+            responses = json.load(f)
+    return StubEngine(responses)
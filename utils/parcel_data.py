@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from config import ConfigData
+
+
+class ParcelRecords:
+    """Parcel records loaded from FG.json, picking up appended records on refresh.
+
+    JSON Lines files (*.jsonl) are read incrementally from the last offset;
+    JSON array files are re-parsed when they change and only the records past
+    the previous end are reported as new.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self._signature = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _read_json_lines(self):
+        new = []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written record, read it next time
+                self._offset += len(line)
+                if line.strip():
+                    new.append(json.loads(line))
+        return new
+
+    def refresh(self):
+        """Loads changes to the source file.
+
+        Returns (new_records, reset): reset is True when the file was
+        replaced or truncated and all records were reloaded.
+        """
+        with self._lock:
+            stat = os.stat(self.path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return [], False
+
+            reset = self._signature is not None and stat.st_size < self._signature[0]
+            if reset:
+                self.records, self._offset = [], 0
+            self._signature = signature
+
+            if self.path.endswith(".jsonl"):
+                new = self._read_json_lines()
+            else:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if len(data) < len(self.records):
+                    self.records, reset = [], True
+                new = data[len(self.records):]
+
+            self.records.extend(new)
+            return new, reset
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_parcel_source():
+    """Returns the shared parcel record source, loading it on first use."""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                source = ParcelRecords(ConfigData.PARCEL_DATA_PATH)
+                source.refresh()
+                _source = source
+    return _source
+
+
+def _reset_after_fork():
+    # Background jobs are forked from the web process, maybe while a warm-up
+    # thread holds these locks; records read mid-refresh can't be trusted
+    global _source, _source_lock
+    if _source is not None and _source._lock.locked():
+        _source = None
+    elif _source is not None:
+        _source._lock = threading.Lock()
+    _source_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
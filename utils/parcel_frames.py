@@ -0,0 +1,104 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.parcel_data import get_parcel_source
+from utils.parcel_store import get_parcel_store
+
+# Flattened DataFrame columns (named after the record fields, see
+# ConfigData.DATAFRAME_SCHEMA) and the parcel store column each comes from.
+CATEGORY_FIELDS = {
+    "status": "status",
+    "Registered_location": "registered_location",
+    "customer_location": "customer_location",
+    "sort_strategy": "sort_strategy",
+    "actual_destination": "actual_destination",
+    "exit_state": "exit_state",
+}
+INTEGER_FIELDS = {
+    "pic": "pic",
+    "sort_code": "sort_code",
+    "barcode_count": "barcode_count",
+    "barcode_state": "barcode_state",
+    "volume_state": "volume_state",
+    "length": "length",
+    "width": "width",
+    "height": "height",
+    "box_volume": "box_volume",
+    "real_volume": "real_volume",
+}
+BOOLEAN_FIELDS = {"barcode_error": "barcode_error", "volume_error": "volume_error"}
+STRING_FIELDS = {"hostId": "host_id", "alibi_id": "alibi_id"}
+LIST_FIELDS = {"barcodes": "barcodes", "destinations": "destinations"}
+
+
+def _integers(values):
+    values = np.asarray(values)
+    integral = np.isnan(values) | (values == np.round(values))
+    return pd.array(values, dtype="Int64") if integral.all() else pd.array(values, dtype="Float64")
+
+
+def _lists(values, offsets):
+    values = np.asarray(values).astype(object)
+    offsets = np.asarray(offsets)
+    return [values[start:end].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def parcels_frame(store):
+    """One row per parcel, nested fields flattened, with typed (nullable) columns."""
+    columns = {}
+    for field, name in STRING_FIELDS.items():
+        columns[field] = pd.array(np.asarray(store.column(name)).astype(object), dtype="string")
+    for field, name in CATEGORY_FIELDS.items():
+        codes, categories = store.categorical(name)
+        columns[field] = pd.Categorical.from_codes(np.asarray(codes), categories=pd.Index(categories, dtype=object))
+    for field, name in INTEGER_FIELDS.items():
+        columns[field] = _integers(store.column(name))
+    for field, name in BOOLEAN_FIELDS.items():
+        flags = np.asarray(store.column(name))
+        columns[field] = pd.arrays.BooleanArray(flags == 1, flags < 0)
+    for field, name in LIST_FIELDS.items():
+        columns[field] = _lists(*store.list_column(name))
+    return pd.DataFrame(columns)
+
+
+def events_frame(records):
+    """One row per parcel event: parcel (row in the parcels frame), hostId, seq, type, raw."""
+    rows = [
+        (i, record.get("hostId"), seq, event.get("type"), event.get("raw"))
+        for i, record in enumerate(records)
+        for seq, event in enumerate(record.get("events") or [], start=1)
+    ]
+    frame = pd.DataFrame(rows, columns=["parcel", "hostId", "seq", "type", "raw"])
+    frame["type"] = frame["type"].astype("category")
+    return frame
+
+
+_frames = None
+_frames_version = None
+_frames_lock = threading.Lock()
+
+
+def get_parcel_frames():
+    """(parcels, events) DataFrames, rebuilt when the parcel data changes."""
+    global _frames, _frames_version
+    with _frames_lock:
+        source = get_parcel_source()
+        source.refresh()
+        store = get_parcel_store()
+        version = (store.meta["size"], store.meta["mtime_ns"], len(source.records))
+        if version != _frames_version:
+            _frames = parcels_frame(store), events_frame(source.records)
+            _frames_version = version
+        return _frames
+
+
+def _reset_after_fork():
+    # _frames is only assigned complete; only the lock needs replacing
+    global _frames_lock
+    _frames_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from config import ConfigData
+from utils.parcel_data import get_parcel_source
+
+
+class ParcelIndex:
+    """Hash indexes over parcel records by host id, barcode and alibi id.
+
+    Index values are positions in the record list, so records are stored
+    once however many keys point at them.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.by_host_id = {}
+        self.by_alibi_id = {}
+        self.by_barcode = defaultdict(list)
+
+    def add(self, records):
+        """Indexes records appended after the ones already indexed."""
+        start = len(self.records)
+        self.records.extend(records)
+        for position, record in enumerate(records, start=start):
+            host_id = record.get("hostId")
+            if host_id is not None:
+                self.by_host_id[str(host_id)] = position
+            alibi_id = record.get("alibi_id")
+            if alibi_id is not None:
+                self.by_alibi_id[str(alibi_id)] = position
+            for barcode in (record.get("barcode_data") or {}).get("barcodes") or []:
+                self.by_barcode[str(barcode)].append(position)
+
+    def lookup(self, search_by, value):
+        """Records matching value for search_by ("host_id", "barcode" or "alibi_id"); "*" matches all."""
+        value = str(value).strip()
+        if value == "*":
+            return list(self.records)
+        search_by = (search_by or "barcode").lower()
+        if search_by == "host_id":
+            positions = [self.by_host_id[value]] if value in self.by_host_id else []
+        elif search_by == "alibi_id":
+            positions = [self.by_alibi_id[value]] if value in self.by_alibi_id else []
+        else:
+            positions = self.by_barcode.get(value, [])
+        return [self.records[p] for p in positions]
+
+
+_index = None
+_index_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+def get_parcel_index():
+    """Returns the shared index, folding in records appended to the source since the last call."""
+    global _index, _last_refresh
+    with _index_lock:
+        now = time.monotonic()
+        # A full index is built aside and only published once the source
+        # loaded, so a missing or unreadable file is retried on the next call
+        if _index is None:
+            index = ParcelIndex()
+            index.add(get_parcel_source().records)
+            _index, _last_refresh = index, now
+        elif now - _last_refresh >= ConfigData.PARCEL_INDEX_REFRESH_SECONDS:
+            new_records, reset = get_parcel_source().refresh()
+            _last_refresh = now
+            if reset:
+                index = ParcelIndex()
+                index.add(get_parcel_source().records)
+                _index = index
+            elif new_records:
+                _index.add(new_records)
+        return _index
+
+
+def _reset_after_fork():
+    # An index being extended at fork time may be half built: rebuild it
+    global _index, _index_lock
+    if _index_lock.locked():
+        _index = None
+    _index_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,229 @@
+import base64
+import csv
+import io
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import diskcache
+import pandas as pd
+from config import ConfigData
+from utils.api_client import post_json
+from utils.parcel_index import get_parcel_index
+
+# Display names for backend fields
+COLUMN_NAMES = {
+    "host_id": "HOST ID",
+    "status": "Status",
+    "barcodes": "Barcode(s)",
+    "alibi_id": "Alibi ID",
+    "register_on_and_at": "Register Time & Location",
+    "identification_on_and_at": "identification Time & Location",
+    "exit_on_and_at": "exit Time & Location",
+    "destination": "Destination",
+    "volume Data": "Volume",
+}
+
+# Full search results live server-side (shared by workers and background
+# jobs); the browser only ever receives the visible page.
+result_cache = diskcache.Cache(os.path.join(ConfigData.BACKGROUND_CACHE_DIR, "parcel-journey"))
+
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+
+def record_to_journey_row(record):
+    """Maps a local parcel record onto the backend's parcel journey row shape."""
+    volume = record.get("volume_data") or {}
+    events = record.get("events") or []
+    return {
+        "host_id": record.get("hostId"),
+        "status": record.get("status"),
+        "barcodes": (record.get("barcode_data") or {}).get("barcodes") or [],
+        "alibi_id": record.get("alibi_id"),
+        "destination": record.get("actual_destination"),
+        "volume Data": f"{volume.get('length')} x {volume.get('width')} x {volume.get('height')}" if volume else None,
+        "RAW": {f"{i}. {event.get('type')}": event.get("raw") for i, event in enumerate(events, start=1)},
+    }
+
+
+def fetch_parcel_journey(date, search_by, search_value):
+    """Parcel journey rows for one search, from the backend or the local index."""
+    if ConfigData.PARCEL_JOURNEY_SOURCE == "local":
+        # The local record set has no per-day partitioning, so date is not used
+        return [record_to_journey_row(r) for r in get_parcel_index().lookup(search_by, search_value)]
+
+    payload = {
+        "date": date,
+        "search_by": search_by,
+        "search_value": search_value,
+    }
+    return post_json("parcel-journey", payload)
+
+
+def results_to_frame(data):
+    """Builds the display DataFrame (RAW logs kept as a column) from backend rows."""
+    for entry in data:
+        for field in ("barcode", "barcodes"):
+            if isinstance(entry.get(field), list):
+                entry[field] = ", ".join(map(str, entry[field]))
+    return pd.DataFrame(data).rename(columns=COLUMN_NAMES)
+
+
+def table_columns(df):
+    """DataTable columns for a result set (RAW logs are loaded on demand)."""
+    return [{"name": col, "id": col} for col in df.columns if col != "RAW"]
+
+
+def save_results(df):
+    """Stores a result set server-side and returns its query id."""
+    query_id = uuid.uuid4().hex
+    result_cache.set(query_id, df, expire=ConfigData.PARCEL_JOURNEY_RESULT_TTL)
+    return query_id
+
+
+def load_results(query_id):
+    return result_cache.get(query_id) if query_id else None
+
+
+def format_raw_log(raw_content):
+    """Formats a RAW log (dict or JSON string) as "key: value" lines."""
+    if isinstance(raw_content, dict):
+        return "\n".join([f"{k}: {v}" for k, v in raw_content.items()])
+    if isinstance(raw_content, str):
+        try:
+            parsed = json.loads(raw_content)
+            return "\n".join([f"{k}: {v}" for k, v in parsed.items()])
+        except (json.JSONDecodeError, AttributeError):
+            return raw_content
+    return str(raw_content)
+
+
+def load_raw_log(query_id, row_id, date=None, host_id=None):
+    """Parses and formats one parcel's RAW log.
+
+    Taken from the cached result set when still available, otherwise
+    fetched again from the backend by host id.
+    """
+    df = load_results(query_id)
+    if df is not None and "RAW" in df.columns and row_id in df.index:
+        return format_raw_log(df.at[row_id, "RAW"])
+
+    if not host_id:
+        return None
+    try:
+        data = fetch_parcel_journey(date, "host_id", host_id)
+    except Exception as e:
+        print(f"Error fetching RAW log for {host_id}: {e}")
+        return None
+    return format_raw_log(data[0].get("RAW", {})) if data else None
+
+
+def parse_bulk_ids(text, upload_contents=None):
+    """Collects unique IDs from pasted text and/or the first column of an uploaded CSV."""
+    ids = re.split(r"[\s,;]+", text or "")
+    if upload_contents:
+        _, encoded = upload_contents.split(",", 1)
+        decoded = base64.b64decode(encoded).decode("utf-8-sig", errors="replace")
+        ids += [row[0] for row in csv.reader(io.StringIO(decoded)) if row]
+    ids = [i.strip().strip('"') for i in ids]
+    return list(dict.fromkeys(i for i in ids if i))[:ConfigData.PARCEL_JOURNEY_BULK_MAX_IDS]
+
+
+def bulk_lookup(date, search_by, ids, on_progress=None):
+    """Looks up each ID concurrently; returns result rows tagged with a per-ID status.
+
+    on_progress(done, total) is called as lookups complete.
+    """
+    results = {}
+    workers = max(1, min(ConfigData.PARCEL_JOURNEY_BULK_WORKERS, len(ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_parcel_journey, date, search_by, i): i for i in ids}
+        for done, future in enumerate(as_completed(futures), start=1):
+            lookup_id = futures[future]
+            try:
+                data = future.result() or []
+                status = f"found ({len(data)})" if data else "not found"
+            except Exception as e:
+                data, status = [], f"error: {e}"
+            results[lookup_id] = [{"Lookup ID": lookup_id, "Lookup Status": status, **row} for row in data] \
+                or [{"Lookup ID": lookup_id, "Lookup Status": status}]
+            if on_progress is not None:
+                on_progress(done, len(ids))
+
+    # Keep the order the IDs were given in
+    return [row for lookup_id in ids for row in results[lookup_id]]
+
+
+def split_filter_part(filter_part):
+    """Parses one DataTable filter clause into (column, operator, value, value text).
+
+    Unquoted numbers are returned as floats; the value text keeps them as typed.
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ""
+                if v0 == value_part[-1:] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # word operators need spaces after them in the filter string,
+                # but we don't want these later
+                return name, operator_type[0].strip(), value, value_part
+
+    return [None] * 4
+
+
+def query_results(df, sort_by, filter_query):
+    """Applies DataTable custom filtering and sorting to a result set."""
+    for filter_part in (filter_query or "").split(" && "):
+        col_name, operator, filter_value, value_text = split_filter_part(filter_part)
+        if col_name not in df.columns:
+            continue
+        column = df[col_name]
+        if operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+            if isinstance(filter_value, str):
+                column = column.astype(str)
+            elif not pd.api.types.is_numeric_dtype(column):
+                # A number against text (IDs, statuses): "=" matches it as
+                # typed, ordering compares the values that parse as numbers
+                if operator in ("eq", "ne"):
+                    column, filter_value = column.astype(str), value_text
+                else:
+                    column = pd.to_numeric(column, errors="coerce")
+            df = df.loc[getattr(column, operator)(filter_value)]
+        elif operator == "contains":
+            text = filter_value if isinstance(filter_value, str) else value_text
+            df = df.loc[column.astype(str).str.contains(text, case=False, regex=False, na=False)]
+        elif operator == "datestartswith":
+            text = filter_value if isinstance(filter_value, str) else value_text
+            df = df.loc[column.astype(str).str.startswith(text, na=False)]
+
+    sort_by = [col for col in (sort_by or []) if col["column_id"] in df.columns]
+    if sort_by:
+        df = df.sort_values(
+            [col["column_id"] for col in sort_by],
+            ascending=[col["direction"] == "asc" for col in sort_by],
+            key=lambda s: s.astype(str) if s.dtype == object else s,
+            kind="mergesort",
+            na_position="last",
+        )
+    return df
@@ -0,0 +1,158 @@
+import bisect
+import heapq
+import os
+import threading
+from array import array
+from collections import defaultdict
+import numpy as np
+from config import ConfigData
+from utils.parcel_store import get_parcel_store
+
+NGRAM = 3
+MAX_INSERTS = 16
+
+# Parcel store columns offered as suggestions, per "search by" option:
+# keys for the store rows from `start` onwards
+SUGGESTION_FIELDS = {
+    "host_id": lambda store, start: store.column("host_id")[start:],
+    "barcode": lambda store, start: store.list_column("barcodes")[0][store.list_column("barcodes")[1][start]:],
+    "alibi_id": lambda store, start: store.column("alibi_id")[start:],
+}
+
+
+def _ngrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class SuggestionIndex:
+    """Prefix and fuzzy (n-gram) lookup over one kind of parcel identifier.
+
+    Prefix search runs over a sorted key array (bisect to the first match,
+    then a contiguous slice), which behaves like a trie walk without a node
+    per character. Fuzzy search ranks keys by shared trigrams, starting
+    from the rarest trigrams of the query.
+    """
+
+    def __init__(self):
+        self.keys = []            # key ids -> original keys
+        self._ids = {}            # normalized key -> key id
+        self._sorted = []         # sorted normalized keys, for prefix search
+        self._sorted_ids = []     # key ids in the same order as _sorted
+        self._grams = defaultdict(lambda: array("I"))
+
+    def add(self, keys):
+        """Adds new keys; existing keys are ignored."""
+        new = []
+        for key in keys:
+            key = str(key)
+            if not key:
+                continue
+            norm = key.upper()
+            if norm in self._ids:
+                continue
+            key_id = len(self.keys)
+            self._ids[norm] = key_id
+            self.keys.append(key)
+            new.append((norm, key_id))
+            for gram in _ngrams(norm):
+                self._grams[gram].append(key_id)
+        if not new:
+            return
+
+        new.sort()
+        # A few keys are inserted in place (O(n) each); more are merged in
+        # one linear pass, so large appends never go quadratic
+        if len(new) <= MAX_INSERTS:
+            for norm, key_id in new:
+                position = bisect.bisect_left(self._sorted, norm)
+                self._sorted.insert(position, norm)
+                self._sorted_ids.insert(position, key_id)
+        else:
+            merged = list(heapq.merge(zip(self._sorted, self._sorted_ids), new))
+            self._sorted = [norm for norm, _ in merged]
+            self._sorted_ids = [key_id for _, key_id in merged]
+
+    def prefix(self, query, limit):
+        query = query.upper()
+        start = bisect.bisect_left(self._sorted, query)
+        matches = []
+        for position in range(start, min(start + limit, len(self._sorted))):
+            if not self._sorted[position].startswith(query):
+                break
+            matches.append(self.keys[self._sorted_ids[position]])
+        return matches
+
+    def fuzzy(self, query, limit, max_grams=6):
+        grams = [g for g in _ngrams(query.upper()) if g in self._grams]
+        if not grams:
+            return []
+        # The rarest trigrams are the most selective and the cheapest to scan
+        grams.sort(key=lambda g: len(self._grams[g]))
+        postings = [np.frombuffer(self._grams[g], dtype=np.uint32) for g in grams[:max_grams]]
+        candidates, shared = np.unique(np.concatenate(postings), return_counts=True)
+        min_shared = max(1, len(postings) // 2)
+        keep = shared >= min_shared
+        candidates, shared = candidates[keep], shared[keep]
+        best = np.argsort(-shared, kind="stable")[:limit]
+        return [self.keys[candidates[i]] for i in best]
+
+    def suggest(self, query, limit):
+        suggestions = self.prefix(query, limit)
+        if len(suggestions) < limit and len(query) >= NGRAM:
+            seen = set(suggestions)
+            suggestions += [k for k in self.fuzzy(query, limit) if k not in seen][:limit - len(suggestions)]
+        return suggestions
+
+
+_indexes = {}
+_indexed_records = 0
+_indexed_source = None
+_lock = threading.Lock()
+
+
+def get_suggestion_indexes():
+    """Suggestion indexes per kind, built once and then fed only rows appended to the store."""
+    global _indexes, _indexed_records, _indexed_source
+    with _lock:
+        store = get_parcel_store()
+        source = (store.meta["source"], store.meta["generation"])
+        if source != _indexed_source or len(store) < _indexed_records:
+            _indexes = {name: SuggestionIndex() for name in SUGGESTION_FIELDS}
+            _indexed_records, _indexed_source = 0, source
+        if len(store) > _indexed_records:
+            for name, field in SUGGESTION_FIELDS.items():
+                _indexes[name].add(field(store, _indexed_records).tolist())
+            _indexed_records = len(store)
+        return _indexes
+
+
+def _reset_after_fork():
+    # Background jobs are forked from the web process, maybe while the
+    # warm-up thread holds the lock with the indexes half built
+    global _indexes, _indexed_records, _indexed_source, _lock
+    if _lock.locked():
+        _indexes, _indexed_records, _indexed_source = {}, 0, None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def warm_suggestion_indexes():
+    """Builds the parcel store and suggestion indexes in a background thread."""
+    threading.Thread(target=get_suggestion_indexes, name="parcel-search-warmup", daemon=True).start()
+
+
+def suggest(search_by, query, limit=None):
+    """Typeahead suggestions for the search box."""
+    limit = limit or ConfigData.PARCEL_SEARCH_SUGGESTIONS
+    query = (query or "").strip()
+    if len(query) < 2 or query == "*":
+        return []
+
+    kind = (search_by or "barcode").lower()
+    if kind not in SUGGESTION_FIELDS:
+        kind = "barcode"
+    return get_suggestion_indexes()[kind].suggest(query, limit)
@@ -0,0 +1,298 @@
+import glob
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from config import ConfigData
+
+try:
+    import fcntl
+except ImportError:  # Windows: ingest isn't coordinated between processes
+    fcntl = None
+
+# Column layout for the record schema in ConfigData.TABLE_SCHEMA.
+# Repeated strings are stored as int32 codes into a category list, numbers as
+# float64 (NaN = missing), flags as int8 (-1 = missing), identifiers as
+# fixed-width unicode, and list fields as a flat array plus row offsets.
+CATEGORICAL_COLUMNS = {
+    "status": lambda r: r.get("status"),
+    "registered_location": lambda r: r.get("Registered_location"),
+    "customer_location": lambda r: r.get("customer_location"),
+    "sort_strategy": lambda r: r.get("sort_strategy"),
+    "actual_destination": lambda r: r.get("actual_destination"),
+    "exit_state": lambda r: r.get("exit_state"),
+}
+NUMERIC_COLUMNS = {
+    "pic": lambda r: r.get("pic"),
+    "sort_code": lambda r: r.get("sort_code"),
+    "barcode_count": lambda r: (r.get("barcode_data") or {}).get("barcode_count"),
+    "barcode_state": lambda r: (r.get("barcode_data") or {}).get("barcode_state"),
+    "volume_state": lambda r: (r.get("volume_data") or {}).get("volume_state"),
+    "length": lambda r: (r.get("volume_data") or {}).get("length"),
+    "width": lambda r: (r.get("volume_data") or {}).get("width"),
+    "height": lambda r: (r.get("volume_data") or {}).get("height"),
+    "box_volume": lambda r: (r.get("volume_data") or {}).get("box_volume"),
+    "real_volume": lambda r: (r.get("volume_data") or {}).get("real_volume"),
+}
+FLAG_COLUMNS = {
+    "barcode_error": lambda r: r.get("barcode_error"),
+    "volume_error": lambda r: r.get("volume_error"),
+}
+STRING_COLUMNS = {
+    "host_id": lambda r: r.get("hostId"),
+    "alibi_id": lambda r: r.get("alibi_id"),
+}
+LIST_COLUMNS = {
+    "barcodes": lambda r: (r.get("barcode_data") or {}).get("barcodes") or [],
+    "destinations": lambda r: r.get("destinations") or [],
+}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_flag(value):
+    return -1 if value is None else int(bool(value))
+
+
+class ParcelStoreReset(Exception):
+    """The store was re-ingested from scratch after this view was opened."""
+
+
+def _generation_dir(directory, generation):
+    return os.path.join(directory, f"gen-{generation}")
+
+
+class ParcelStore:
+    """Read-only columnar view of the parcel records, memory-mapped from disk.
+
+    Workers map the same files, so the columns are loaded once into the OS
+    page cache and shared between processes instead of being parsed into
+    Python objects per worker.
+
+    A view shows the records of its meta only. Ingest appends to the column
+    files of the current generation, so every column is cut to
+    meta["records"] rows; a re-ingest from scratch starts a new generation
+    directory, which leaves the files of open views alone.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.categories = meta["categories"]
+        self._data_dir = _generation_dir(directory, meta["generation"])
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["records"]
+
+    def _rows(self, name):
+        if name.endswith("_offsets"):
+            return self.meta["records"] + 1
+        if name.endswith("_values"):
+            return int(self.column(f"{name[:-len('_values')]}_offsets")[-1])
+        return self.meta["records"]
+
+    def column(self, name):
+        """Raw column array (codes for categorical columns), as of this view's meta."""
+        if name not in self._columns:
+            path = os.path.join(self._data_dir, f"{name}.npy")
+            try:
+                try:
+                    values = np.load(path, mmap_mode="r")
+                except ValueError:  # empty arrays can't be memory-mapped
+                    values = np.load(path)
+            except FileNotFoundError:
+                raise ParcelStoreReset(f"parcel store generation {self.meta['generation']} was removed")
+            rows = self._rows(name)
+            if len(values) < rows:
+                raise ParcelStoreReset(f"parcel store column {name} is shorter than its metadata")
+            self._columns[name] = values[:rows]
+        return self._columns[name]
+
+    def categorical(self, name):
+        """(codes, categories) for a categorical column; code -1 means missing."""
+        return self.column(name), self.categories[name]
+
+    def decoded(self, name):
+        """Categorical column as an object array of strings (None = missing)."""
+        codes, categories = self.categorical(name)
+        lookup = np.array(list(categories) + [None], dtype=object)
+        return lookup[codes]
+
+    def list_column(self, name):
+        """(values, offsets) for a list column; row i is values[offsets[i]:offsets[i + 1]]."""
+        return self.column(f"{name}_values"), self.column(f"{name}_offsets")
+
+
+class _Builder:
+    """Converts records into column arrays, extending existing category lists."""
+
+    def __init__(self, categories):
+        self.categories = {name: list(categories.get(name, [])) for name in CATEGORICAL_COLUMNS}
+        self.codes = {name: {v: i for i, v in enumerate(values)} for name, values in self.categories.items()}
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        value = str(value)
+        codes = self.codes[name]
+        if value not in codes:
+            codes[value] = len(self.categories[name])
+            self.categories[name].append(value)
+        return codes[value]
+
+    def columns(self, records):
+        columns = {}
+        for name, get in CATEGORICAL_COLUMNS.items():
+            columns[name] = np.fromiter((self._code(name, get(r)) for r in records), dtype=np.int32, count=len(records))
+        for name, get in NUMERIC_COLUMNS.items():
+            columns[name] = np.fromiter((_to_float(get(r)) for r in records), dtype=np.float64, count=len(records))
+        for name, get in FLAG_COLUMNS.items():
+            columns[name] = np.fromiter((_to_flag(get(r)) for r in records), dtype=np.int8, count=len(records))
+        for name, get in STRING_COLUMNS.items():
+            columns[name] = np.array(["" if get(r) is None else str(get(r)) for r in records], dtype=str)
+        for name, get in LIST_COLUMNS.items():
+            lists = [[str(v) for v in get(r)] for r in records]
+            columns[f"{name}_values"] = np.array([v for values in lists for v in values], dtype=str)
+            columns[f"{name}_counts"] = np.fromiter((len(v) for v in lists), dtype=np.int64, count=len(lists))
+        return columns
+
+
+def _read_new_records(path, meta):
+    """Records appended to the source since meta was written, and the new read offset."""
+    if path.endswith(".jsonl"):
+        records, offset = [], meta.get("offset", 0)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.strip():
+                    records.append(json.loads(line))
+        return records, offset
+    with open(path) as f:
+        records = json.load(f)
+    return records[meta.get("records", 0):], 0
+
+
+def _append(old, new):
+    if old is None or len(old) == 0:
+        return new
+    if len(new) == 0:
+        return np.asarray(old)
+    return np.concatenate([old, new])
+
+
+def ingest(source_path, directory):
+    """Brings the on-disk store up to date with the source file; returns its metadata.
+
+    Only records appended since the last ingest are converted. A source that
+    shrank (replaced or truncated) is re-ingested from scratch into a new
+    generation directory; the one before it is kept for views still open.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, "meta.json")
+    stat = os.stat(source_path)
+
+    meta, generation = {}, 1
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        generation = meta.get("generation", 0)
+        if (meta.get("source") != os.path.abspath(source_path) or stat.st_size < meta.get("size", 0)
+                or "generation" not in meta):
+            meta, generation = {}, generation + 1
+    if meta.get("size") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+        return meta
+
+    data_dir = _generation_dir(directory, generation)
+    os.makedirs(data_dir, exist_ok=True)
+
+    records, offset = _read_new_records(source_path, meta)
+    builder = _Builder(meta.get("categories", {}))
+    new_columns = builder.columns(records)
+    old = ParcelStore(directory, meta) if meta else None
+
+    for name, values in new_columns.items():
+        if name.endswith("_counts"):
+            list_name = name[:-len("_counts")]
+            old_offsets = old.column(f"{list_name}_offsets") if old else np.zeros(1, dtype=np.int64)
+            values = old_offsets[-1] + np.cumsum(values)
+            name, values = f"{list_name}_offsets", _append(old_offsets, values)
+        else:
+            values = _append(old.column(name) if old else None, values)
+        tmp_path = os.path.join(data_dir, f"{name}.tmp.npy")
+        np.save(tmp_path, values)
+        os.replace(tmp_path, os.path.join(data_dir, f"{name}.npy"))
+
+    meta = {
+        "source": os.path.abspath(source_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "offset": offset,
+        "records": meta.get("records", 0) + len(records),
+        "categories": builder.categories,
+        "generation": generation,
+    }
+    tmp_meta = meta_path + ".tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+    # Generations before the previous one, and files of the unversioned layout
+    for path in glob.glob(os.path.join(directory, "gen-*")):
+        if int(os.path.basename(path)[len("gen-"):]) < generation - 1:
+            shutil.rmtree(path, ignore_errors=True)
+    for path in glob.glob(os.path.join(directory, "*.npy")):
+        os.remove(path)
+    return meta
+
+
+def _locked_ingest(source_path, directory):
+    """Runs ingest holding a file lock, so only one process converts new records."""
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        return ingest(source_path, directory)
+    with open(os.path.join(directory, "ingest.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            return ingest(source_path, directory)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_parcel_store():
+    """Returns the columnar parcel store, ingesting appended source records first.
+
+    Nothing is loaded until the first call.
+    """
+    global _store
+    with _store_lock:
+        stat = os.stat(ConfigData.PARCEL_DATA_PATH)
+        if _store is not None and (_store.meta["size"], _store.meta["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return _store
+        meta = _locked_ingest(ConfigData.PARCEL_DATA_PATH, ConfigData.PARCEL_STORE_DIR)
+        _store = ParcelStore(ConfigData.PARCEL_STORE_DIR, meta)
+        return _store
+
+
+def _reset_after_fork():
+    # A forked child gets the lock in whatever state another thread left it;
+    # _store itself is only ever assigned complete
+    global _store_lock
+    _store_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
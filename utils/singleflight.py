@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process coalescing is unavailable
+    fcntl = None
+
+# A temp result file this old was left by a process that died while writing it
+STALE_TMP_SECONDS = 300
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs fn; callers arriving while it is still
+    running wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class SharedFlight:
+    """Coalesces identical calls across worker processes on one host.
+
+    Callers take an exclusive file lock per key; the holder runs fn and
+    writes the JSON result next to the lock, so processes that were waiting
+    on the lock read it instead of repeating the call. Expired results and
+    their locks are deleted by a writer at most every prune_interval seconds.
+    """
+
+    def __init__(self, directory, prune_interval=60):
+        self.directory = directory
+        self.prune_interval = prune_interval
+        self._pruned_at = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, name)
+        return base + ".lock", base + ".json"
+
+    def _read(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("expires", 0) > time.time() else None
+
+    def do(self, key, ttl, fn):
+        lock_path, result_path = self._paths(key)
+        entry = self._read(result_path)
+        if entry is not None:
+            return entry["data"]
+
+        with self._locked(lock_path) as lock_file:
+            try:
+                # Another process may have fetched it while we waited
+                entry = self._read(result_path)
+                if entry is not None:
+                    return entry["data"]
+                data = fn()
+                tmp_path = f"{result_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"expires": time.time() + ttl, "data": data}, f)
+                os.replace(tmp_path, result_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._maybe_prune()
+        return data
+
+    def _locked(self, lock_path):
+        """Opens and exclusively locks lock_path; the caller unlocks and closes it."""
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # _prune may have unlinked the file while we waited for it
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        self._prune(now)
+
+    def _prune(self, now):
+        """Deletes expired results, their locks, and leftover temp files."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".tmp"):
+                    if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                        os.remove(path)
+                    continue
+                if not name.endswith(".lock"):
+                    continue
+                result_path = path[:-len(".lock")] + ".json"
+                if self._read(result_path) is not None:
+                    continue
+                with open(path, "a") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue  # a call for this key is running
+                    if self._read(result_path) is None:
+                        if os.path.exists(result_path):
+                            os.remove(result_path)
+                        os.remove(path)
+            except OSError:
+                continue
+
+
+def make_shared_flight(directory):
+    """Returns a SharedFlight for directory, or None if not configured/supported."""
+    if not directory:
+        return None
+    if fcntl is None:
+        print("Cross-process request coalescing needs fcntl; continuing without it.")
+        return None
+    return SharedFlight(directory)
@@ -1,7 +1,26 @@
-import requests
+import datetime
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+import numpy as np
 from dash import dcc, html
-import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
+from config import ConfigData
+from utils.api_client import cached_post_json
+
+# Finest bin the backend is asked for; coarser bins are summed client-side
+BASE_BIN_SIZE = 1
+BIN_SIZES = [1, 10, 20, 30, 60]
+
+# Chart point budget: about one point per horizontal pixel of a chart
+MIN_CHART_POINTS = 200
+MAX_CHART_POINTS = 2000
+DEFAULT_VIEWPORT_WIDTH = 1200
+
+# Traces with more points than this are rendered with WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+
+_TIME_KEY = re.compile(r"^(\d{1,2}):(\d{2})")
 
 # API Call
 def fetch_throughput_data(selected_date, bin_size, start_time, end_time):
@@ -12,56 +31,201 @@ def fetch_throughput_data(selected_date, bin_size, start_time, end_time):
             "start_time": start_time,
             "end_time": end_time
         }
-        response = requests.post("http://127.0.0.1:8000/throughput", json=payload)
-        # response = requests.post("https://backend-vanderlande-3jss.onrender.com/throughput", json=payload)
-        response.raise_for_status()
-        return response.json()
+        return cached_post_json("throughput", payload)
     except Exception as e:
         print(f"Throughput API error: {e}")
         return {}
 
-# KPI Card Generator
-def generate_kpi_card(title, value, card_class):
-    return dbc.Card(
-        dbc.CardBody([
-            html.H5(title, className="metric-title"),
-            html.H2(value, className="metric-value")
-        ]),
-        className=f"metric-card {card_class}"
-    )
+# Series for the browser
+def _bin_label(selected_date, key):
+    """Returns "YYYY-MM-DD HH:MM" for "HH:MM" keys so bins sort and rebin by clock time."""
+    match = _TIME_KEY.match(str(key))
+    if not match:
+        return str(key)
+    return f"{str(selected_date)[:10]} {int(match.group(1)):02d}:{match.group(2)}"
+
+
+def build_series(selected_date, data):
+    """Flattens a throughput response into aligned arrays for the series store."""
+    in_data = data.get("parcels_in_time", {}) or {}
+    out_data = data.get("parcels_out_time", {}) or {}
 
-# Chart Generator
-def create_area_chart(data_dict, title, color):
-    if not data_dict:
-        return html.Div(f"No data available for {title}", className="text-danger")
+    keys = list(in_data)
+    keys += [k for k in out_data if k not in in_data]
+    return {
+        "x": [_bin_label(selected_date, k) for k in keys],
+        "in": [in_data.get(k, 0) for k in keys],
+        "out": [out_data.get(k, 0) for k in keys],
+        "total_in": data.get("total_in", 0),
+        "total_out": data.get("total_out", 0),
+        "overflow": data.get("overflow", 0),
+    }
 
+def target_points(viewport_width):
+    """Point budget per chart; two charts share a row on wide screens."""
+    width = viewport_width or DEFAULT_VIEWPORT_WIDTH
+    chart_width = width / 2 if width >= 992 else width
+    return int(min(MAX_CHART_POINTS, max(MIN_CHART_POINTS, chart_width)))
+
+
+def _label_minutes(labels):
+    """Minutes since the epoch for "YYYY-MM-DD HH:MM" labels (bin index otherwise)."""
     try:
-        x = list(data_dict.keys())
-        y = list(data_dict.values())
-
-        fig = go.Figure(go.Scatter(
-            x=x,
-            y=y,
-            fill='tozeroy',
-            mode='lines',
-            line=dict(color=color),
-            name=title
-        ))
-
-        fig.update_layout(
-            title=title,
-            xaxis_title="Time",
-            yaxis_title="Number of Parcels",
-            plot_bgcolor="white",
-            paper_bgcolor="white",
-            margin=dict(l=20, r=20, t=50, b=30),
-            height=350,  # Fixed height to prevent looping
-            autosize=False
+        stamps = np.array([label[:16].replace(" ", "T") for label in labels], dtype="datetime64[m]")
+        return stamps.astype(np.int64)
+    except ValueError:
+        return np.arange(len(labels), dtype=np.int64)
+
+
+def bin_starts(minutes, bin_size):
+    """Index of the first 1-minute bin in each clock-aligned bin of bin_size minutes."""
+    if bin_size <= 1 or len(minutes) == 0:
+        return np.arange(len(minutes))
+    buckets = minutes // bin_size
+    return np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+
+def lttb_downsample(x, y, n_out):
+    """Largest-triangle-three-buckets: indices of n_out points preserving the shape of y(x)."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges = np.append(edges, n)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
         )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
 
-        return dcc.Graph(figure=fig, config={"displayModeBar": False}, style={"height": "350px"})
 
-    except Exception as e:
-        print(f"Error generating area chart for {title}: {e}")
-        return html.Div(f"Error rendering chart for {title}")
+def _display_trace(labels, minutes, values, budget):
+    keep = lttb_downsample(minutes, values, budget)
+    return {"x": labels[keep].tolist(), "y": values[keep].astype(int).tolist()}
+
+
+def build_display(series, viewport_width):
+    """Prepares a series for the browser within the chart point budget.
+
+    Series that fit the budget are sent at full 1-minute resolution and
+    rebinned client-side. Longer ones are rebinned here for every bin size
+    and LTTB-downsampled, so the store and figures stay bounded by the
+    viewport rather than by the length of the window.
+    """
+    budget = target_points(viewport_width)
+    display = {k: v for k, v in series.items() if k not in ("x", "in", "out")}
+    display["webgl_threshold"] = WEBGL_THRESHOLD
+
+    if len(series["x"]) <= budget:
+        display.update(mode="full", x=series["x"], **{"in": series["in"], "out": series["out"]})
+        return display
+
+    labels = np.array(series["x"], dtype=object)
+    minutes = _label_minutes(series["x"])
+    values = {name: np.asarray(series[name], dtype=float) for name in ("in", "out")}
+
+    # Same clock-aligned sums as throughput.rebin in assets/throughput.js
+    bins = {}
+    for bin_size in BIN_SIZES:
+        starts = bin_starts(minutes, bin_size)
+        entry = {}
+        for name, full in values.items():
+            rebinned = np.add.reduceat(full, starts)
+            entry[f"avg_{name}"] = round(float(rebinned.mean()), 2)
+            entry[name] = _display_trace(labels[starts], minutes[starts], rebinned, budget)
+        bins[str(bin_size)] = entry
+
+    display.update(mode="downsampled", bins=bins)
+    return display
+
+# Date-range mode
+def day_chunks(start_date, end_date, start_time, end_time):
+    """One (date, start_time, end_time) backend query per day of the range."""
+    first = datetime.date.fromisoformat(str(start_date)[:10])
+    last = datetime.date.fromisoformat(str(end_date)[:10])
+    days = min((last - first).days + 1, ConfigData.THROUGHPUT_MAX_RANGE_DAYS)
+    return [((first + datetime.timedelta(days=i)).isoformat(), start_time, end_time) for i in range(days)]
+
+
+def zoom_chunks(zoom_start, zoom_end, start_time, end_time):
+    """Per-day queries covering a zoomed "YYYY-MM-DD HH:MM" range, clipped to the daily window."""
+    chunks = []
+    for day, day_start, day_end in day_chunks(zoom_start[:10], zoom_end[:10], start_time, end_time):
+        if day == zoom_start[:10]:
+            day_start = max(day_start, zoom_start[11:16])
+        if day == zoom_end[:10]:
+            day_end = min(day_end, zoom_end[11:16])
+        if day_start < day_end:
+            chunks.append((day, day_start, day_end))
+    return chunks
+
+
+def merge_series(parts):
+    """Concatenates per-day series (already in day order) into one series."""
+    return {
+        "x": list(chain.from_iterable(p["x"] for p in parts)),
+        "in": list(chain.from_iterable(p["in"] for p in parts)),
+        "out": list(chain.from_iterable(p["out"] for p in parts)),
+        "total_in": sum(p["total_in"] or 0 for p in parts),
+        "total_out": sum(p["total_out"] or 0 for p in parts),
+        "overflow": sum(p["overflow"] or 0 for p in parts),
+    }
+
+
+def fetch_series_chunks(chunks, on_chunk=None):
+    """Fetches 1-minute series for each chunk through a bounded pool and merges them.
+
+    on_chunk(done, total, merged) is called as chunks arrive with the merge of
+    the chunks received so far, so callers can stream partial results.
+    """
+    parts = {}
+    workers = max(1, min(ConfigData.THROUGHPUT_FETCH_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_throughput_data, day, BASE_BIN_SIZE, start_time, end_time): i
+            for i, (day, start_time, end_time) in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            data = future.result()
+            if data:
+                parts[i] = build_series(chunks[i][0], data)
+            else:
+                print(f"Throughput chunk {chunks[i]} returned no data")
+            if on_chunk is not None and done < len(chunks) and parts:
+                on_chunk(done, len(chunks), merge_series([parts[k] for k in sorted(parts)]))
+
+    if not parts:
+        return None
+    return merge_series([parts[k] for k in sorted(parts)])
+
+# KPI Card Generator
+def generate_kpi_card(title, value, card_class, card_id=None):
+    """KPI card; with card_id, the title and value get ids "<card_id>-title"/"-value"."""
+    title_props = {"id": f"{card_id}-title"} if card_id else {}
+    value_props = {"id": f"{card_id}-value"} if card_id else {}
+    return dbc.Card(
+        dbc.CardBody([
+            html.H5(title, className="metric-title", **title_props),
+            html.H2(value, className="metric-value", **value_props)
+        ]),
+        className=f"metric-card {card_class}"
+    )
 
+# Chart container; the figure is built client-side by assets/throughput.js
+def area_chart_graph(graph_id):
+    return dcc.Graph(id=graph_id, figure={}, config={"displayModeBar": False}, style={"height": "350px"})
@@ -0,0 +1,109 @@
+import os
+import time
+
+import diskcache
+import numpy as np
+
+from config import ConfigData
+from utils.api_client import post_json
+from utils.volume_utils import bin_volume_scans, fetch_volume_scans
+
+DISTRIBUTION_FIELDS = ("height_distribution", "width_distribution", "length_distribution")
+LOCK_EXPIRE = 120
+
+# Running totals of live volume windows, shared by all workers: the merged
+# histograms (or binned joint counts) and the time they are current to.
+live_windows = diskcache.Cache(os.path.join(ConfigData.BACKGROUND_CACHE_DIR, "volume-live"))
+
+
+def window_key(payload):
+    return [payload.get("date"), payload.get("start_time"), payload.get("end_time")]
+
+
+def merge_counts(total, delta):
+    """Adds a {value: count} histogram into total, in place."""
+    for value, count in delta.items():
+        total[value] = total.get(value, 0) + count
+
+
+def _refresh(kind, payload, fetch, add, equal, max_age):
+    """Shared refresh logic for live windows.
+
+    fetch(payload) returns (state, as_of, since) for the scans the backend
+    selected, where as_of is the time the response is current to and since
+    echoes the payload's "since" if the backend applied it. A response is
+    added to the stored state with add(state, delta) only if it confirms
+    both; anything else is taken as the whole window and replaces the state
+    (compared with equal). Without a backend as_of every refresh is a full
+    fetch. A refresh within max_age seconds is reused, and a lock keeps
+    workers from adding the same delta twice.
+    """
+    key = (kind, *window_key(payload))
+    with diskcache.Lock(live_windows, ("lock", *key), expire=LOCK_EXPIRE):
+        entry = live_windows.get(key)
+        if entry is not None and time.time() - entry["fetched_at"] < max_age:
+            return entry
+        since = entry["as_of"] if entry is not None else None
+        state, as_of, echoed = fetch(payload if since is None else {**payload, "since": since})
+        if since is not None and as_of is not None and echoed == since:
+            changed = add(entry["state"], state)
+        else:
+            changed = entry is None or not equal(entry["state"], state)
+            entry = {"state": state, "revision": entry["revision"] if entry is not None else 0}
+        entry["revision"] += changed
+        entry.update(as_of=as_of, fetched_at=time.time())
+        live_windows.set(key, entry, expire=ConfigData.VOLUME_LIVE_TTL)
+        return entry
+
+
+def _fetch_volume(payload):
+    data = post_json("volume", payload)
+    state = {field: dict(data.get(field) or {}) for field in DISTRIBUTION_FIELDS}
+    state["normal_distribution"] = data.get("normal_distribution", {})
+    return state, data.get("as_of"), data.get("since")
+
+
+def _add_volume(state, delta):
+    changed = False
+    for field in DISTRIBUTION_FIELDS:
+        if delta[field]:
+            merge_counts(state[field], delta[field])
+            changed = True
+    return changed
+
+
+def live_volume(payload, max_age=0):
+    """Volume histograms of a live window, kept current by delta fetches.
+
+    The first call fetches the whole window; later calls ask the backend
+    only for the scans since its last reported "as_of" and add them to the
+    stored histograms, if the response echoes "since". Returns {"state":
+    <"volume" response fields>, "revision", "as_of", "fetched_at"};
+    revision changes whenever new scans arrive. After a delta the Gaussian
+    fit (normal_distribution) is the one of the last full fetch.
+    """
+    return _refresh("volume", payload, _fetch_volume, _add_volume, lambda a, b: a == b, max_age)
+
+
+def _fetch_joint(payload):
+    scans = fetch_volume_scans(payload)
+    return bin_volume_scans(scans), scans.get("as_of"), scans.get("since")
+
+
+def _add_joint(state, delta):
+    for name, counts in delta.items():
+        state[name] += counts
+    return any(counts.any() for counts in delta.values())
+
+
+def _equal_joint(a, b):
+    return all(np.array_equal(a[name], b[name]) for name in b)
+
+
+def live_joint(payload, max_age=0):
+    """Like live_volume, for the bin_volume_scans counts of a live window.
+
+    The fixed bin edges make the binned counts of each delta addable. The
+    local parcel store reports no as_of, so it is rebinned whole.
+    """
+    return _refresh("joint", payload, _fetch_joint, _add_joint, _equal_joint, max_age)
@@ -1,7 +1,290 @@
+import os
+import diskcache
 import numpy as np
 import plotly.graph_objects as go
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from config import ConfigData
+from utils.api_client import post_json
+from utils.cache import window_is_live
+from utils.parcel_store import get_parcel_store
+
+PERCENTILES = (5, 50, 95)
+KPI_OPERATORS = {"<=": "≤", ">=": "≥"}
+KDE_GRID_POINTS = 512
+
+SCAN_FIELDS = ("length", "width", "height", "box_volume", "real_volume")
+CLASSIFY_CHUNK = 1_000_000
+
+# Density curves per (date, window, dimension), shared by background jobs
+kde_cache = diskcache.Cache(os.path.join(ConfigData.BACKGROUND_CACHE_DIR, "volume-kde"))
+# Joint histograms and box-class counts per (date, window)
+joint_cache = diskcache.Cache(os.path.join(ConfigData.BACKGROUND_CACHE_DIR, "volume-joint"))
+
+
+def distribution_arrays(data_dict):
+    """Converts a {value: count} distribution to (values, counts) arrays sorted by value."""
+    if not data_dict:
+        return np.empty(0), np.empty(0)
+    values = np.fromiter(data_dict.keys(), dtype=np.float64, count=len(data_dict))
+    counts = np.fromiter(data_dict.values(), dtype=np.float64, count=len(data_dict))
+    order = np.argsort(values, kind="stable")
+    return values[order], counts[order]
+
+
+def distribution_stats(values, counts, thresholds=()):
+    """Weighted statistics of a histogram, computed from one cumulative sum.
+
+    Returns total, min, max, mean, std, p5/p50/p95 and, for each
+    (operator, threshold) in thresholds, the number of parcels on that side
+    ("<=" only counts values > 0). Returns None for an empty distribution.
+    """
+    total = counts.sum() if len(counts) else 0
+    if total <= 0:
+        return None
+
+    cumulative = np.concatenate([[0.0], np.cumsum(counts)])
+    mean = np.dot(values, counts) / total
+    std = np.sqrt(np.dot((values - mean) ** 2, counts) / total)
+    ranks = np.searchsorted(cumulative[1:], np.asarray(PERCENTILES) / 100.0 * total, side="left")
+    percentiles = values[np.minimum(ranks, len(values) - 1)]
+    present = values[counts > 0]
+
+    threshold_counts = {}
+    if thresholds:
+        limits = np.array([t for _, t in thresholds], dtype=np.float64)
+        up_to = cumulative[np.searchsorted(values, limits, side="right")]
+        below = cumulative[np.searchsorted(values, limits, side="left")]
+        non_positive = cumulative[np.searchsorted(values, 0.0, side="right")]
+        for (op, t), le, lt in zip(thresholds, up_to, below):
+            threshold_counts[(op, t)] = int(le - non_positive) if op == "<=" else int(total - lt)
+
+    stats = {
+        "total": int(total),
+        "min": float(present[0]),
+        "max": float(present[-1]),
+        "mean": float(mean),
+        "std": float(std),
+        "thresholds": threshold_counts,
+    }
+    stats.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)})
+    return stats
+
+
+def _weighted_quantiles(values, counts, quantiles):
+    cumulative = np.cumsum(counts)
+    ranks = np.searchsorted(cumulative, np.asarray(quantiles) * cumulative[-1], side="left")
+    return values[np.minimum(ranks, len(values) - 1)]
+
+
+def histogram_kde(values, counts, grid_points=KDE_GRID_POINTS):
+    """Gaussian kernel density estimate of a histogram, by binned FFT convolution.
+
+    The bandwidth follows Silverman's rule on the weighted std dev and IQR,
+    but is never narrower than the histogram's bin spacing. The counts are
+    linearly binned onto a regular grid and smoothed in the frequency
+    domain, so the cost is O(bins + grid log grid) whatever the parcel count.
+    Values <= 0 (no measurement) are ignored.
+
+    Returns (x, density, bandwidth), or None if there is nothing to estimate.
+    """
+    keep = (values > 0) & (counts > 0)
+    values, counts = values[keep], counts[keep]
+    total = counts.sum() if len(counts) else 0
+    if total <= 0:
+        return None
+
+    mean = np.dot(values, counts) / total
+    std = np.sqrt(np.dot((values - mean) ** 2, counts) / total)
+    q25, q75 = _weighted_quantiles(values, counts, (0.25, 0.75))
+    spread = min(std, (q75 - q25) / 1.34) or std
+    spacing = np.diff(values).min() if len(values) > 1 else 1.0
+    bandwidth = max(0.9 * spread * total ** -0.2, spacing, 1e-9)
+
+    # Linear binning onto the grid, which extends 4 bandwidths past the data
+    lo, hi = values[0] - 4 * bandwidth, values[-1] + 4 * bandwidth
+    x = np.linspace(lo, hi, grid_points)
+    dx = x[1] - x[0]
+    position = (values - lo) / dx
+    left = np.floor(position).astype(np.int64)
+    frac = position - left
+    grid = np.bincount(left, weights=counts * (1 - frac), minlength=grid_points + 1)
+    grid += np.bincount(left + 1, weights=counts * frac, minlength=grid_points + 1)[:len(grid)]
+    grid = grid[:grid_points]
+
+    # Convolve with the Gaussian kernel via its Fourier transform; zero
+    # padding to twice the grid keeps the circular convolution from wrapping
+    size = 2 * grid_points
+    freq = np.fft.rfftfreq(size, d=dx)
+    smoothed = np.fft.irfft(np.fft.rfft(grid, size) * np.exp(-2 * (np.pi * freq * bandwidth) ** 2), size)
+    density = np.clip(smoothed[:grid_points], 0, None) / (total * dx)
+    return x, density, bandwidth
+
+
+def cached_histogram_kde(payload, name, values, counts):
+    """histogram_kde cached per (date, window, dimension, parcel count).
+
+    Windows that have ended are kept like backend responses; live windows
+    only briefly.
+    """
+    key = (payload.get("date"), payload.get("start_time"), payload.get("end_time"), name, float(counts.sum()))
+    kde = kde_cache.get(key)
+    if kde is None:
+        kde = histogram_kde(values, counts)
+        historical_ttl, live_ttl = ConfigData.BACKEND_CACHE_TTLS["volume"]
+        kde_cache.set(key, kde, expire=live_ttl if window_is_live(payload) else historical_ttl)
+    return kde
+
+
+def generate_kde_chart(kde, title, xaxis_title):
+    """Plots a density curve from histogram_kde output."""
+    if kde is None:
+        return html.Div("No data for density estimate", className="text-muted")
+    x, density, bandwidth = kde
+
+    fig = go.Figure(data=[go.Scatter(x=x, y=density, mode="lines", line=dict(color="#59a14f"), fill="tozeroy")])
+    fig.update_layout(
+        title=f"{title} (bandwidth {bandwidth:.1f} mm)",
+        xaxis_title=xaxis_title,
+        yaxis_title="Probability Density",
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=300
+    )
+    return html.Div(dcc_graph_wrapper(fig))
+
+
+def fetch_volume_scans(payload):
+    """Per-scan dimensions for the window, as {field: float64 array} (NaN = missing).
+
+    Backend responses may also report "as_of", the time the scans are current
+    to, and echo "since" if they were limited to the scans after it.
+    """
+    if ConfigData.VOLUME_SCANS_SOURCE == "local":
+        store = get_parcel_store()
+        return {field: np.asarray(store.column(field), dtype=np.float64) for field in SCAN_FIELDS}
+    data = post_json("volume-scans", payload)
+    scans = {field: np.asarray(data.get(field) or [], dtype=np.float64) for field in SCAN_FIELDS}
+    scans["as_of"] = data.get("as_of")
+    scans["since"] = data.get("since")
+    return scans
+
+
+def joint_bin_edges():
+    """Fixed (dimension, fill ratio, box volume) bin edges from ConfigData."""
+    dimension = np.arange(0, ConfigData.VOLUME_HEATMAP_MAX_MM + ConfigData.VOLUME_HEATMAP_BIN_MM,
+                          ConfigData.VOLUME_HEATMAP_BIN_MM, dtype=np.float64)
+    fill_ratio = np.linspace(0, 1.2, ConfigData.VOLUME_FILL_RATIO_BINS + 1)
+    box_volume = np.logspace(*ConfigData.VOLUME_BOX_VOLUME_LOG10_RANGE, ConfigData.VOLUME_BOX_VOLUME_BINS + 1)
+    return dimension, fill_ratio, box_volume
+
+
+def box_class_labels():
+    return [name for name, *_ in ConfigData.VOLUME_BOX_CLASSES] + ["Oversize", "Unmeasured"]
+
+
+def classify_boxes(length, width, height):
+    """Counts parcels per carton class (smallest that fits, any orientation), then oversize and unmeasured."""
+    classes = np.sort(np.array([dims for _, *dims in ConfigData.VOLUME_BOX_CLASSES], dtype=np.float64), axis=1)
+    counts = np.zeros(len(classes) + 2, dtype=np.int64)
+    for start in range(0, len(length), CLASSIFY_CHUNK):
+        chunk = slice(start, start + CLASSIFY_CHUNK)
+        dims = np.sort(np.column_stack([length[chunk], width[chunk], height[chunk]]), axis=1)
+        measured = np.all(np.isfinite(dims) & (dims > 0), axis=1)
+        fits = np.all(dims[:, None, :] <= classes[None, :, :], axis=2)
+        index = np.where(fits.any(axis=1), fits.argmax(axis=1), len(classes))
+        index[~measured] = len(classes) + 1
+        counts += np.bincount(index, minlength=len(classes) + 2)
+    return counts
+
+
+def bin_volume_scans(scans):
+    """Length x width and box volume x fill ratio histograms, and box-class counts.
+
+    Values past the last edge are counted in the last bin. The bin edges
+    are fixed, so results for the same window can be added together.
+    """
+    dimension_edges, fill_edges, box_edges = joint_bin_edges()
+    length, width, height = scans["length"], scans["width"], scans["height"]
+    box_volume, real_volume = scans["box_volume"], scans["real_volume"]
+
+    measured = np.isfinite(length) & np.isfinite(width) & (length > 0) & (width > 0)
+    length_width, _, _ = np.histogram2d(
+        np.clip(length[measured], 0, dimension_edges[-1]),
+        np.clip(width[measured], 0, dimension_edges[-1]),
+        bins=(dimension_edges, dimension_edges),
+    )
+
+    filled = np.isfinite(box_volume) & np.isfinite(real_volume) & (box_volume > 0) & (real_volume > 0)
+    box_fill, _, _ = np.histogram2d(
+        np.clip(box_volume[filled], box_edges[0], box_edges[-1]),
+        np.clip(real_volume[filled] / box_volume[filled], 0, fill_edges[-1]),
+        bins=(box_edges, fill_edges),
+    )
+
+    return {
+        "length_width": length_width.astype(np.int64),
+        "box_fill": box_fill.astype(np.int64),
+        "box_classes": classify_boxes(length, width, height),
+    }
+
+
+def cached_joint_distributions(payload):
+    """bin_volume_scans for the window, cached like histogram_kde."""
+    key = (payload.get("date"), payload.get("start_time"), payload.get("end_time"), ConfigData.VOLUME_SCANS_SOURCE)
+    binned = joint_cache.get(key)
+    if binned is None:
+        binned = bin_volume_scans(fetch_volume_scans(payload))
+        historical_ttl, live_ttl = ConfigData.BACKEND_CACHE_TTLS["volume"]
+        joint_cache.set(key, binned, expire=live_ttl if window_is_live(payload) else historical_ttl)
+    return binned
+
+
+def _centers(edges, log=False):
+    return np.sqrt(edges[:-1] * edges[1:]) if log else (edges[:-1] + edges[1:]) / 2
+
+
+def generate_heatmap(counts, x_edges, y_edges, title, xaxis_title, yaxis_title, log_x=False):
+    """Heatmap of a 2D histogram; the payload is bins x bins whatever the parcel count."""
+    if counts.sum() == 0:
+        return html.Div("No data available", className="text-muted")
+
+    z = np.where(counts.T > 0, counts.T, np.nan)
+    fig = go.Figure(data=[go.Heatmap(
+        x=_centers(x_edges, log_x), y=_centers(y_edges), z=z,
+        colorscale="Viridis", colorbar=dict(title="Count"),
+        hovertemplate="%{x:.0f}, %{y:.2f}: %{z} parcels<extra></extra>",
+    )])
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=300
+    )
+    if log_x:
+        fig.update_xaxes(type="log")
+    return html.Div(dcc_graph_wrapper(fig))
+
+
+def generate_box_class_chart(counts):
+    """Bar chart of parcels per carton class."""
+    total = counts.sum()
+    if total == 0:
+        return html.Div("No data available", className="text-muted")
+
+    fig = go.Figure(data=[go.Bar(
+        x=box_class_labels(), y=counts, marker_color="#4e79a7",
+        text=[f"{c / total * 100:.1f} %" for c in counts], textposition="outside",
+    )])
+    fig.update_layout(
+        title="Parcels per Box Class",
+        xaxis_title="Box class",
+        yaxis_title="Count",
+        margin=dict(l=20, r=20, t=40, b=20),
+        height=300
+    )
+    return html.Div(dcc_graph_wrapper(fig))
+
 
 def generate_bar_chart(data_dict, title, xaxis_title):
     """Generates a bar chart from distribution data."""
@@ -44,30 +327,30 @@ def generate_normal_chart(stats_dict, title, xaxis_title):
     return html.Div(dcc_graph_wrapper(fig))
 
 
-def generate_stats_table(h_data, w_data, l_data):
-    """Generates table with min, max, avg for each dimension."""
-    def calc_stats(data_dict):
-        if not data_dict:
-            return "-", "-", "-"
-        values = list(map(float, data_dict.keys()))
-        counts = list(data_dict.values())
-        avg = np.average(values, weights=counts)
-        return min(values), max(values), round(avg, 2)
+STATS_COLUMNS = [("Min", "min"), ("Max", "max"), ("Average", "mean"), ("Std Dev", "std")] + [
+    ("Median" if p == 50 else f"P{p}", f"p{p}") for p in PERCENTILES
+]
 
-    h_min, h_max, h_avg = calc_stats(h_data)
-    w_min, w_max, w_avg = calc_stats(w_data)
-    l_min, l_max, l_avg = calc_stats(l_data)
 
-    table_header = [
-        html.Thead(html.Tr([html.Th("Dimension"), html.Th("Min"), html.Th("Max"), html.Th("Average")]))
-    ]
-    table_body = [
-        html.Tbody([
-            html.Tr([html.Td("Height (mm)"), html.Td(h_min), html.Td(h_max), html.Td(h_avg)]),
-            html.Tr([html.Td("Width (mm)"), html.Td(w_min), html.Td(w_max), html.Td(w_avg)]),
-            html.Tr([html.Td("Length (mm)"), html.Td(l_min), html.Td(l_max), html.Td(l_avg)])
+def generate_stats_rows(stats_by_dimension):
+    """Body rows of generate_stats_table."""
+    return [
+        html.Tr([html.Td(label)] + [
+            html.Td(round(stats[key], 2) if stats else "-") for _, key in STATS_COLUMNS
         ])
+        for label, stats in stats_by_dimension.items()
+    ]
+
+
+def generate_stats_table(stats_by_dimension):
+    """Generates table with min, max, average, std dev and percentiles per dimension.
+
+    stats_by_dimension maps a row label to distribution_stats() output (or None).
+    """
+    table_header = [
+        html.Thead(html.Tr([html.Th("Dimension")] + [html.Th(title) for title, _ in STATS_COLUMNS]))
     ]
+    table_body = [html.Tbody(generate_stats_rows(stats_by_dimension))]
 
     return dbc.Table(table_header + table_body, bordered=True, striped=True, hover=True, responsive=True)
 
@@ -89,6 +372,25 @@ def generate_kpi_card(title, count, pct, color="#17a2b8"):
         className="mb-3"
     )
 
+def kpi_values(stats_by_name, thresholds):
+    """(count, percentage) per (dimension, operator, threshold, color) entry, from distribution_stats()."""
+    values = []
+    for name, op, threshold, _ in thresholds:
+        stats = stats_by_name.get(name)
+        count = stats["thresholds"].get((op, threshold), 0) if stats else 0
+        pct = round(count / stats["total"] * 100, 2) if stats else 0
+        values.append((count, pct))
+    return values
+
+
+def generate_kpi_row(stats_by_name, thresholds):
+    """KPI cards for (dimension, operator, threshold, color) entries, from distribution_stats()."""
+    cards = []
+    for (name, op, threshold, color), (count, pct) in zip(thresholds, kpi_values(stats_by_name, thresholds)):
+        title = f"Allocated {name.capitalize()} {KPI_OPERATORS[op]} {threshold} mm"
+        cards.append(dbc.Col(generate_kpi_card(title, count, pct, color=color), width=max(12 // len(thresholds), 3)))
+    return html.Div(cards, className="row mb-4")
+
 def dcc_graph_wrapper(fig):
     """Wrap Plotly figure in a responsive Div."""
     return dcc.Graph(figure=fig, config={"displayModeBar": False}, style={"height": "300px"})